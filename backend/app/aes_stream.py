@@ -0,0 +1,154 @@
+import os
+import struct
+from typing import Callable, Optional
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.metrics import CRYPTO_SECONDS, CRYPTO_FAILURES
+
+# ===============================
+# SEGMENTED AES-GCM STREAM
+# ===============================
+# Large payloads are split into fixed-size chunks, each sealed on its own:
+#
+#   header = MAGIC | chunk_size (u32) | key id length (u8) | key id
+#            | nonce_prefix (7 bytes)
+#   nonce  = nonce_prefix | chunk counter (u32) | last-chunk flag (1 byte)
+#
+# The header is the associated data of every chunk. The counter stops
+# chunks being reordered or dropped, and the last-chunk flag stops the
+# stream being truncated at a chunk boundary.
+
+MAGIC = b"CGS1"
+FIXED_LEN = len(MAGIC) + 4 + 1
+PREFIX_LEN = 7
+TAG_LEN = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Largest chunk a decryptor accepts (the sender picks the size)
+MAX_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNKS = 2 ** 32
+
+
+def _nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    if counter >= MAX_CHUNKS:
+        raise ValueError("Stream too long")
+    return prefix + struct.pack(">IB", counter, 1 if last else 0)
+
+
+class StreamEncryptor:
+    def __init__(self, cipher: AESGCM, key_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        kid = key_id.encode()
+        if len(kid) > 255:
+            raise ValueError("Key id too long")
+
+        self.cipher = cipher
+        self.chunk_size = chunk_size
+        self.prefix = os.urandom(PREFIX_LEN)
+        self.header = (
+            MAGIC + struct.pack(">IB", chunk_size, len(kid)) + kid + self.prefix
+        )
+
+        self._buf = bytearray()
+        self._counter = 0
+
+    def _seal(self, chunk: bytes, last: bool) -> bytes:
+        nonce = _nonce(self.prefix, self._counter, last)
+        self._counter += 1
+        with CRYPTO_SECONDS.time(("aes_stream_encrypt",)):
+            return self.cipher.encrypt(nonce, chunk, self.header)
+
+    def update(self, data: bytes) -> bytes:
+        """Encrypt every complete chunk; keep the remainder buffered."""
+        self._buf += data
+        out = bytearray()
+
+        # Keep at least one byte back: the final chunk must carry the flag
+        while len(self._buf) > self.chunk_size:
+            out += self._seal(bytes(self._buf[:self.chunk_size]), last=False)
+            del self._buf[:self.chunk_size]
+
+        return bytes(out)
+
+    def finalize(self) -> bytes:
+        out = self._seal(bytes(self._buf), last=True)
+        self._buf.clear()
+        return out
+
+
+class StreamDecryptor:
+    def __init__(self, resolve: Callable[[str], AESGCM], max_chunk_size: int = MAX_CHUNK_SIZE):
+        """`resolve` maps the key id found in the header to a cipher."""
+        self.resolve = resolve
+        self.max_chunk_size = max_chunk_size
+
+        self.cipher: Optional[AESGCM] = None
+        self.key_id: Optional[str] = None
+        self.header: Optional[bytes] = None
+        self._prefix = b""
+        self._sealed_size = 0
+        self._buf = bytearray()
+        self._counter = 0
+        self._done = False
+
+    def _open(self, sealed: bytes, last: bool) -> bytes:
+        nonce = _nonce(self._prefix, self._counter, last)
+        self._counter += 1
+        try:
+            with CRYPTO_SECONDS.time(("aes_stream_decrypt",)):
+                return self.cipher.decrypt(nonce, sealed, self.header)
+        except Exception:
+            CRYPTO_FAILURES.inc(("aes_stream_decrypt",))
+            raise ValueError("Integrity verification failed")
+
+    def _read_header(self) -> bool:
+        """Parse the header once enough bytes arrived. False if not yet."""
+        if len(self._buf) < FIXED_LEN:
+            return False
+
+        if bytes(self._buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not an encrypted stream")
+
+        chunk_size, kid_len = struct.unpack(">IB", self._buf[len(MAGIC):FIXED_LEN])
+        if not 0 < chunk_size <= self.max_chunk_size:
+            raise ValueError("Invalid stream chunk size")
+
+        header_len = FIXED_LEN + kid_len + PREFIX_LEN
+        if len(self._buf) < header_len:
+            return False
+
+        self.header = bytes(self._buf[:header_len])
+        self.key_id = self.header[FIXED_LEN:FIXED_LEN + kid_len].decode(errors="replace")
+        self._prefix = self.header[FIXED_LEN + kid_len:]
+        self._sealed_size = chunk_size + TAG_LEN
+        del self._buf[:header_len]
+
+        try:
+            self.cipher = self.resolve(self.key_id)
+        except Exception:
+            raise ValueError("Integrity verification failed")
+        return True
+
+    def update(self, data: bytes) -> bytes:
+        if self._done:
+            raise ValueError("Data after end of stream")
+
+        self._buf += data
+        if self.header is None and not self._read_header():
+            return b""
+
+        out = bytearray()
+        # A full sealed chunk is only "not last" once more data follows it
+        while len(self._buf) > self._sealed_size:
+            out += self._open(bytes(self._buf[:self._sealed_size]), last=False)
+            del self._buf[:self._sealed_size]
+
+        return bytes(out)
+
+    def finalize(self) -> bytes:
+        if self.header is None:
+            raise ValueError("Truncated stream")
+
+        out = self._open(bytes(self._buf), last=True)
+        self._buf.clear()
+        self._done = True
+        return out
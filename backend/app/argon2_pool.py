@@ -0,0 +1,174 @@
+import asyncio
+import math
+from collections import deque
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Optional
+
+from app.config import ARGON2_WORKERS, ARGON2_QUEUE_DEPTH
+
+# ===============================
+# ARGON2 WORKER POOL
+# ===============================
+# Argon2 runs on its own executor instead of Starlette's shared threadpool,
+# so a burst of hashing cannot starve the AES / HMAC / SOC endpoints.
+# argon2-cffi releases the GIL while hashing, so threads use every core.
+
+class PoolBusyError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Argon2 worker pool is saturated")
+        self.retry_after = retry_after
+
+
+class TimingStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.avg * 1000, 2),
+            "max_ms": round(self.max * 1000, 2)
+        }
+
+
+class Argon2Pool:
+    def __init__(self, workers: int = ARGON2_WORKERS, queue_depth: int = ARGON2_QUEUE_DEPTH):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.max_inflight = workers + queue_depth
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="argon2"
+        )
+        # Batches wait for slots instead of being rejected, but all of them
+        # together never hold more than batch_slots: the rest stay free for
+        # single requests, however many batches are running
+        self.batch_slots = max(1, min(workers, self.max_inflight - 1))
+
+        # Only touched from the event loop
+        self._inflight = 0
+        self._batch_inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait = TimingStats()
+        self.execution = TimingStats()
+
+    def retry_after(self) -> int:
+        # Time to drain the current backlog at the observed hash rate
+        per_hash = self.execution.avg or 1.0
+        return max(1, math.ceil(per_hash * self._inflight / self.workers))
+
+    def submit(self, fn: Callable, *args, on_start: Optional[Callable] = None,
+               batch: bool = False) -> asyncio.Future:
+        """Admit a job or raise PoolBusyError. Must be called on the event loop."""
+        if self._inflight >= self.max_inflight:
+            self.rejected += 1
+            raise PoolBusyError(self.retry_after())
+
+        self._inflight += 1
+        self._batch_inflight += batch
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            if on_start is not None:
+                on_start()
+
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self.queue_wait.record(started - submitted)
+                    self.execution.record(finished - started)
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        try:
+            future = self._executor.submit(job)
+        except RuntimeError:
+            self._inflight -= 1
+            self._batch_inflight -= batch
+            raise
+
+        # Release the slot when the hash really ends, not when the caller
+        # gives up waiting: an abandoned hash still holds its memory
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, batch))
+
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn: Callable, *args):
+        return await self.submit(fn, *args)
+
+    async def submit_when_ready(self, fn: Callable, *args) -> asyncio.Future:
+        """Submit a batch job, waiting for a free slot instead of rejecting."""
+        while self._inflight >= self.max_inflight or self._batch_inflight >= self.batch_slots:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Woken and cancelled at once: hand the wake-up on
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        return self.submit(fn, *args, batch=True)
+
+    def _release(self, batch: bool = False) -> None:
+        self._inflight -= 1
+        self._batch_inflight -= batch
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "inflight": self._inflight,
+                "batch_slots": self.batch_slots,
+                "batch_inflight": self._batch_inflight,
+                "queued": max(0, self._inflight - self.workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_wait": self.queue_wait.as_dict(),
+                "execution": self.execution.as_dict()
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+argon2_pool = Argon2Pool()
@@ -0,0 +1,327 @@
+"""
+Attack campaigns: thousands of mixed legitimate and malicious requests,
+sent concurrently to the in-process app through httpx's ASGI transport.
+
+Nonces, threat scores and SOC events live in private copies bound to the
+campaign's own context, so a campaign neither burns real nonces, blocks
+real clients nor floods the dashboard, even while the server is taking
+real traffic. Only one campaign runs at a time. Endpoint: POST /attack-campaign.
+
+    python -m app.attack_campaign --requests 5000 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app import security, soc_store, threat
+from app.config import HMAC_SIGNED_PREFIXES
+from app.nonce_store import NonceStore
+from app.soc_store import EventPipeline, EventStore
+from app.threat import ThreatEngine
+
+UPLOAD_PATH = "/hmac/signed/upload"
+
+# kind -> legitimate?
+KINDS = {
+    "hmac_ok": True,
+    "aes_ok": True,
+    "upload_ok": True,
+    "hmac_forged": False,
+    "hmac_replay": False,
+    "hmac_stale": False,
+    "aes_tamper": False,
+    "upload_tampered": False
+}
+
+# ===============================
+# ISOLATED STATE
+# ===============================
+
+class CampaignBusyError(Exception):
+    pass
+
+
+# One campaign at a time: each one saturates the event loop on its own
+_RUNNING = threading.Lock()
+
+
+@contextlib.contextmanager
+def isolated_state(threats: Optional[ThreatEngine] = None) -> Iterator[Dict]:
+    """Private nonce store, threat engine and SOC pipeline (no sinks).
+
+    The copies are bound to the *_OVERRIDE context variables read by
+    current_nonces(), current_threats() and current_pipeline(), not patched
+    into module globals: only code running in this context (its tasks, the
+    ASGI calls they make and the threads those hand off to) sees them. Real
+    requests served meanwhile keep the process-wide instances.
+    """
+    state = {
+        "nonces": NonceStore(window=security.HMAC_WINDOW_SECONDS),
+        "threats": threats or ThreatEngine(),
+        "pipeline": EventPipeline(EventStore(capacity=soc_store.MAX_EVENTS))
+    }
+
+    tokens = [
+        (security.NONCE_OVERRIDE, security.NONCE_OVERRIDE.set(state["nonces"])),
+        (threat.THREATS_OVERRIDE, threat.THREATS_OVERRIDE.set(state["threats"])),
+        (soc_store.PIPELINE_OVERRIDE, soc_store.PIPELINE_OVERRIDE.set(state["pipeline"]))
+    ]
+    try:
+        yield state
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+        state["pipeline"].flush()
+        state["pipeline"].stop()
+
+# ===============================
+# REQUEST FACTORY
+# ===============================
+
+class Campaign:
+    def __init__(self, total: int, concurrency: int, attack_ratio: float,
+                 legit_clients: int = 200, attackers: int = 5, seed: Optional[int] = None):
+        self.total = total
+        self.concurrency = concurrency
+        self.attack_ratio = attack_ratio
+        self.rng = random.Random(seed)
+
+        self.legit_ips = [f"10.1.{i // 250}.{i % 250 + 1}" for i in range(legit_clients)]
+        self.attacker_ips = [f"203.0.113.{i + 1}" for i in range(attackers)]
+
+        self.uploads = any(UPLOAD_PATH.startswith(p) for p in HMAC_SIGNED_PREFIXES)
+        self.legit_kinds = [k for k, ok in KINDS.items() if ok and (self.uploads or "upload" not in k)]
+        self.attack_kinds = [k for k, ok in KINDS.items() if not ok and (self.uploads or "upload" not in k)]
+
+        self._keyed = security.hmac_state()
+        self.accepted: List[Dict] = []   # accepted payloads an attacker can replay
+
+    def _sign(self, message: bytes) -> str:
+        mac = self._keyed.copy()
+        mac.update(message)
+        return mac.hexdigest()
+
+    def _hmac_params(self, user_id: str, age: int = 0) -> Dict:
+        nonce = uuid.uuid4().hex[:12]
+        timestamp = str(int(time.time()) - age)
+        params = {
+            "action": "TRANSFER",
+            "user_id": user_id,
+            "resource": "account",
+            "nonce": nonce,
+            "timestamp": timestamp
+        }
+        params["signature"] = self._sign(
+            f"TRANSFER|{user_id}|account|{nonce}|{timestamp}".encode()
+        )
+        return params
+
+    def _upload(self, body: bytes, tamper: bool) -> Dict:
+        nonce = uuid.uuid4().hex
+        timestamp = str(int(time.time()))
+        signature = self._sign(f"POST|{UPLOAD_PATH}|{nonce}|{timestamp}|".encode() + body)
+        return {
+            "method": "POST",
+            "url": UPLOAD_PATH,
+            "content": body + b"!" if tamper else body,
+            "headers": {"x-signature": signature, "x-nonce": nonce, "x-timestamp": timestamp}
+        }
+
+    def build(self, kind: str) -> Tuple[str, Dict]:
+        """(client ip, httpx request kwargs) for one request of `kind`."""
+        if KINDS[kind]:
+            ip = self.rng.choice(self.legit_ips)
+            user_id = f"user-{ip}"
+        else:
+            ip = self.rng.choice(self.attacker_ips)
+            user_id = "admin"
+
+        if kind in ("hmac_ok", "hmac_forged", "hmac_stale"):
+            params = self._hmac_params(user_id, age=999 if kind == "hmac_stale" else 0)
+            if kind == "hmac_forged":
+                params["signature"] = self._sign(b"forged")
+            return ip, {"method": "POST", "url": "/hmac-demo", "params": params}
+
+        if kind == "hmac_replay":
+            if not self.accepted:
+                # Nothing captured yet: a valid-looking signature over a reused nonce
+                params = self._hmac_params(user_id)
+                params["signature"] = self._sign(b"captured")
+            else:
+                params = self.rng.choice(self.accepted)
+            return ip, {"method": "POST", "url": "/hmac-demo", "params": params}
+
+        if kind in ("aes_ok", "aes_tamper"):
+            enc = security.encrypt_and_verify_aes(f"record-{self.rng.random()}")
+            ciphertext = enc["ciphertext"]
+            if kind == "aes_tamper":
+                ciphertext = ciphertext[:-2] + ("00" if ciphertext[-2:] != "00" else "ff")
+            params = {"ciphertext": ciphertext, "nonce": enc["nonce"], "key_id": enc["key_id"]}
+            return ip, {"method": "POST", "url": "/aes-decrypt", "params": params}
+
+        return ip, self._upload(self.rng.randbytes(4096), tamper=kind == "upload_tampered")
+
+    def plan(self) -> List[str]:
+        kinds = []
+        for _ in range(self.total):
+            attack = self.rng.random() < self.attack_ratio
+            kinds.append(self.rng.choice(self.attack_kinds if attack else self.legit_kinds))
+        return kinds
+
+# ===============================
+# RUN
+# ===============================
+
+def percentiles(samples: List[float]) -> Dict:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+
+    def at(p: float) -> float:
+        return round(ordered[max(0, math.ceil(p * len(ordered)) - 1)] * 1000, 2)
+
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": at(1.0)}
+
+
+async def run_campaign(total: int = 2000, concurrency: int = 50, attack_ratio: float = 0.5,
+                       legit_clients: int = 200, attackers: int = 5,
+                       seed: Optional[int] = None) -> Dict:
+    """Raises CampaignBusyError if another campaign is still running."""
+    if not _RUNNING.acquire(blocking=False):
+        raise CampaignBusyError("Another attack campaign is already running")
+    try:
+        return await _run_campaign(total, concurrency, attack_ratio, legit_clients, attackers, seed)
+    finally:
+        _RUNNING.release()
+
+
+async def _run_campaign(total: int, concurrency: int, attack_ratio: float,
+                        legit_clients: int, attackers: int, seed: Optional[int]) -> Dict:
+    # Optional at import time: only campaigns and the bench suite need it
+    import httpx
+
+    from app.main import app
+
+    campaign = Campaign(total, concurrency, attack_ratio, legit_clients, attackers, seed)
+    kinds = campaign.plan()
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    with isolated_state() as state:
+        clients = {
+            ip: httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app, client=(ip, 40000)),
+                base_url="http://campaign"
+            )
+            for ip in campaign.legit_ips + campaign.attacker_ips
+        }
+        queue: asyncio.Queue = asyncio.Queue()
+        for kind in kinds:
+            queue.put_nowait(kind)
+
+        async def worker():
+            while not queue.empty():
+                kind = queue.get_nowait()
+                ip, request = campaign.build(kind)
+                began = time.perf_counter()
+                try:
+                    response = await clients[ip].request(**request)
+                    status = response.status_code
+                except Exception:
+                    # An aborted transfer is a rejection too
+                    status = 0
+                latencies[kind].append(time.perf_counter() - began)
+                statuses[kind][status] += 1
+
+                # Replays only ever reuse requests the server accepted
+                if kind == "hmac_ok" and status == 200:
+                    campaign.accepted.append(request["params"])
+
+        began = time.perf_counter()
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        finally:
+            for client in clients.values():
+                await client.aclose()
+        elapsed = time.perf_counter() - began
+
+        state["pipeline"].flush()
+        pipeline = state["pipeline"]
+        events = Counter(e["event_type"] for e in pipeline.store.latest(pipeline.store.capacity))
+        threats = state["threats"].stats()
+        soc = pipeline.stats()
+
+    return report(kinds, statuses, latencies, elapsed, concurrency, threats, soc, events)
+
+
+def report(kinds, statuses, latencies, elapsed, concurrency, threats, soc, events) -> Dict:
+    attacks = legit = detected = false_positives = rate_limited = 0
+    for kind, counts in statuses.items():
+        ok = sum(n for s, n in counts.items() if 200 <= s < 300)
+        if KINDS[kind]:
+            legit += sum(counts.values())
+            false_positives += sum(counts.values()) - ok
+        else:
+            attacks += sum(counts.values())
+            detected += sum(counts.values()) - ok
+            rate_limited += counts.get(429, 0)
+
+    all_latencies = [x for samples in latencies.values() for x in samples]
+
+    return {
+        "requests": len(kinds),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(kinds) / elapsed, 1) if elapsed else 0.0,
+        "attacks": attacks,
+        "legitimate": legit,
+        "detection_rate": round(detected / attacks, 4) if attacks else None,
+        "false_positive_rate": round(false_positives / legit, 4) if legit else None,
+        "false_positives": false_positives,
+        "blocked": detected,
+        "blocked_before_crypto": rate_limited,
+        "blocked_rps": round(detected / elapsed, 1) if elapsed else 0.0,
+        "latency": percentiles(all_latencies),
+        "by_kind": {
+            kind: {
+                "legitimate": KINDS[kind],
+                "count": sum(statuses[kind].values()),
+                "status": {str(s): n for s, n in sorted(statuses[kind].items())},
+                **percentiles(latencies[kind])
+            }
+            for kind in sorted(statuses)
+        },
+        "threats": threats,
+        "soc": {"pipeline": soc, "events": dict(events)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an attack campaign in-process")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--attack-ratio", type=float, default=0.5)
+    parser.add_argument("--legit-clients", type=int, default=200)
+    parser.add_argument("--attackers", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_campaign(
+        args.requests, args.concurrency, args.attack_ratio,
+        args.legit_clients, args.attackers, args.seed
+    ))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Argon2 parameter calibration.
+
+Benchmarks candidate parameter sets on this host and keeps the strongest
+one whose p95 latency stays under the target while ARGON2_WORKERS hashes
+run at once, and whose concurrent memory fits ARGON2_MEMORY_BUDGET_MB.
+
+    python -m app.calibrate --target-ms 300 --save
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from argon2.low_level import Type, hash_secret_raw
+
+from app.config import (
+    ARGON2_WORKERS,
+    ARGON2_TARGET_P95_MS,
+    ARGON2_MEMORY_BUDGET_MB,
+    ARGON2_PARAMS_FILE
+)
+
+# Current hard-coded defaults, used when nothing has been calibrated
+DEFAULT_PARAMS = {
+    "memory_cost": 65536,
+    "time_cost": 3,
+    "parallelism": 4
+}
+
+# Security floor (OWASP minimum for Argon2id): calibration never goes
+# below it, even on a host too slow to meet the latency target
+MIN_PARAMS = {
+    "memory_cost": 19456,
+    "time_cost": 2,
+    "parallelism": 1
+}
+
+MEMORY_CANDIDATES = [19456, 32768, 65536, 131072, 262144]   # KiB
+TIME_CANDIDATES = [2, 3, 4, 6]
+
+
+def apply_floor(params: Dict) -> Dict:
+    """params with every cost raised to at least MIN_PARAMS."""
+    return {**params, **{k: max(params[k], v) for k, v in MIN_PARAMS.items()}}
+
+# ===============================
+# BENCHMARK
+# ===============================
+
+def p95(samples: List[float]) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)]
+
+
+def measure(memory_cost: int, time_cost: int, parallelism: int,
+            concurrency: int, rounds: int) -> float:
+    """p95 latency in ms with `concurrency` hashes running together."""
+    salt = os.urandom(16)
+
+    def one(_):
+        started = time.perf_counter()
+        hash_secret_raw(
+            b"calibration-password", salt,
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+            hash_len=32,
+            type=Type.ID
+        )
+        return (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(concurrency * rounds)))
+
+    return p95(samples)
+
+
+def calibrate(
+    target_ms: float = ARGON2_TARGET_P95_MS,
+    concurrency: int = ARGON2_WORKERS,
+    memory_budget_mb: int = ARGON2_MEMORY_BUDGET_MB,
+    rounds: int = 3,
+    verbose: bool = False
+) -> Dict:
+    parallelism = max(1, min(os.cpu_count() or 1, 4))
+    max_memory = memory_budget_mb * 1024 // max(concurrency, 1)
+
+    best: Optional[Dict] = None
+    tried = []
+
+    for memory_cost in MEMORY_CANDIDATES:
+        # The floor is always tried, whatever the memory budget says
+        if memory_cost > max(max_memory, MIN_PARAMS["memory_cost"]):
+            break
+
+        # Even the cheapest time_cost missed the target at a smaller memory
+        if tried and tried[-1]["time_cost"] == TIME_CANDIDATES[0] \
+                and tried[-1]["p95_ms"] > target_ms:
+            break
+
+        for time_cost in TIME_CANDIDATES:
+            latency = measure(memory_cost, time_cost, parallelism, concurrency, rounds)
+            tried.append({
+                "memory_cost": memory_cost,
+                "time_cost": time_cost,
+                "p95_ms": round(latency, 1)
+            })
+            if verbose:
+                print(f"m={memory_cost:>6} KiB t={time_cost} p={parallelism}  p95={latency:8.1f} ms")
+
+            # Latency only grows with time_cost: skip the rest of this row
+            if latency > target_ms:
+                break
+
+            strength = memory_cost * time_cost
+            if best is None or strength > best["memory_cost"] * best["time_cost"]:
+                best = {
+                    "memory_cost": memory_cost,
+                    "time_cost": time_cost,
+                    "parallelism": parallelism,
+                    "measured_p95_ms": round(latency, 1)
+                }
+
+    target_met = best is not None
+    if best is None:
+        # Nothing met the target: keep the floor, never anything weaker
+        best = {
+            **MIN_PARAMS,
+            "parallelism": parallelism,
+            "measured_p95_ms": tried[0]["p95_ms"] if tried else None
+        }
+
+    return {
+        **best,
+        "target_met": target_met,
+        "target_p95_ms": target_ms,
+        "concurrency": concurrency,
+        "memory_budget_mb": memory_budget_mb,
+        "cpu_count": os.cpu_count(),
+        "calibrated_at": int(time.time()),
+        "candidates": tried
+    }
+
+# ===============================
+# PERSISTENCE
+# ===============================
+
+def save_params(params: Dict, path: str = ARGON2_PARAMS_FILE) -> None:
+    with open(path, "w") as f:
+        json.dump(params, f, indent=2)
+
+
+def load_params(path: str = ARGON2_PARAMS_FILE) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            params = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not all(k in params for k in DEFAULT_PARAMS):
+        return None
+    # Files saved before the floor existed may hold weaker parameters
+    return apply_floor(params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target-ms", type=float, default=ARGON2_TARGET_P95_MS)
+    parser.add_argument("--concurrency", type=int, default=ARGON2_WORKERS)
+    parser.add_argument("--memory-budget-mb", type=int, default=ARGON2_MEMORY_BUDGET_MB)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--save", action="store_true",
+                        help=f"write the result to {ARGON2_PARAMS_FILE}")
+    args = parser.parse_args()
+
+    params = calibrate(
+        target_ms=args.target_ms,
+        concurrency=args.concurrency,
+        memory_budget_mb=args.memory_budget_mb,
+        rounds=args.rounds,
+        verbose=True
+    )
+    selected = {k: params[k] for k in ("memory_cost", "time_cost", "parallelism", "measured_p95_ms")}
+    print(json.dumps(selected))
+
+    if args.save:
+        save_params(params)
+        print(f"saved to {ARGON2_PARAMS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,122 @@
 import os
 
-# 32-byte key (AES-256)
-AES_KEY = os.getenv(
-    "AES_KEY",
-    "0123456789abcdef0123456789abcdef"
-)
+# 32-byte key (AES-256); a random per-process key when unset
+AES_KEY = os.getenv("AES_KEY")
+AES_KEY = AES_KEY.encode() if AES_KEY else os.urandom(32)
 
+# Must match the secret the frontend signs with
 HMAC_SECRET = os.getenv(
     "HMAC_SECRET",
-    "supersecretkey"
+    "demo-secret"
 )
+
+# Key rings: "kid:secret,kid:secret". AES_KEY / HMAC_SECRET become key
+# "default" when these are unset. Older keys stay usable for decrypt and
+# verify; new output always uses the active key id.
+AES_KEYS = os.getenv("AES_KEYS", "")
+AES_ACTIVE_KEY_ID = os.getenv("AES_ACTIVE_KEY_ID", "")
+HMAC_KEYS = os.getenv("HMAC_KEYS", "")
+HMAC_ACTIVE_KEY_ID = os.getenv("HMAC_ACTIVE_KEY_ID", "")
+
+# Ready cipher / HMAC contexts kept per (key id, tenant)
+KEY_CACHE_SIZE = int(os.getenv("KEY_CACHE_SIZE", "1024"))
+
+# Replay protection backend: "memory" (single worker) or "sqlite"
+# (shared by every worker process on the host)
+NONCE_BACKEND = os.getenv("NONCE_BACKEND", "memory")
+
+NONCE_DB_PATH = os.getenv(
+    "NONCE_DB_PATH",
+    "/tmp/cryptoguard-nonces.db"
+)
+
+# In-memory SOC event ring buffer size
+SOC_MAX_EVENTS = int(os.getenv("SOC_MAX_EVENTS", "1000"))
+
+# Dedicated Argon2 executor: each in-flight hash holds ~64 MiB
+ARGON2_WORKERS = int(os.getenv("ARGON2_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Hashes allowed to wait for a worker before requests get 503
+ARGON2_QUEUE_DEPTH = int(os.getenv("ARGON2_QUEUE_DEPTH", "16"))
+
+# Pause between /argon2-stream steps (seconds, 0 disables pacing)
+ARGON2_STREAM_DELAY = float(os.getenv("ARGON2_STREAM_DELAY", "1"))
+
+# Max passwords accepted by one /argon2/batch call
+ARGON2_BATCH_MAX = int(os.getenv("ARGON2_BATCH_MAX", "10000"))
+
+# Argon2 parameter calibration (python -m app.calibrate)
+ARGON2_TARGET_P95_MS = float(os.getenv("ARGON2_TARGET_P95_MS", "500"))
+ARGON2_MEMORY_BUDGET_MB = int(os.getenv("ARGON2_MEMORY_BUDGET_MB", "512"))
+ARGON2_PARAMS_FILE = os.getenv("ARGON2_PARAMS_FILE", "argon2_params.json")
+
+# Benchmark the host at startup when no saved parameters exist
+ARGON2_CALIBRATE = os.getenv("ARGON2_CALIBRATE", "0") == "1"
+
+# AES request-body endpoints
+AES_MAX_BODY_MB = int(os.getenv("AES_MAX_BODY_MB", "16"))
+AES_BATCH_MAX = int(os.getenv("AES_BATCH_MAX", "10000"))
+AES_BATCH_MAX_MB = int(os.getenv("AES_BATCH_MAX_MB", "64"))
+AES_STREAM_CHUNK_KB = int(os.getenv("AES_STREAM_CHUNK_KB", "64"))
+# /aes/stream/*: output kept in memory up to SPOOL_MB, then in a temp file
+AES_STREAM_SPOOL_MB = int(os.getenv("AES_STREAM_SPOOL_MB", "8"))
+AES_STREAM_MAX_MB = int(os.getenv("AES_STREAM_MAX_MB", "1024"))
+
+# Max signed entries accepted by one /hmac/batch call
+HMAC_BATCH_MAX = int(os.getenv("HMAC_BATCH_MAX", "10000"))
+HMAC_BATCH_MAX_MB = int(os.getenv("HMAC_BATCH_MAX_MB", "16"))
+
+# /ws/soc fan-out: per-client queue (oldest dropped when full) and
+# micro-batching of events into one frame
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_BATCH_MAX = int(os.getenv("WS_BATCH_MAX", "50"))
+WS_BATCH_WINDOW_MS = int(os.getenv("WS_BATCH_WINDOW_MS", "50"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+
+# SOC event pipeline: emit_event() queue size (events beyond it are
+# dropped and counted) and events handled per consumer batch
+SOC_QUEUE_SIZE = int(os.getenv("SOC_QUEUE_SIZE", "100000"))
+SOC_BATCH_MAX = int(os.getenv("SOC_BATCH_MAX", "1000"))
+
+# Persistent SOC event log (append-only JSONL segments). Empty disables it.
+# With several workers each one writes its own segments (named by pid) and
+# /soc/history merges them all. The ring buffer, /soc/events, rollups and
+# /ws/soc stay per worker: they hold the restored history plus that
+# worker's own live events only.
+SOC_LOG_DIR = os.getenv("SOC_LOG_DIR", "data/soc-log")
+SOC_SEGMENT_MB = int(os.getenv("SOC_SEGMENT_MB", "64"))
+SOC_SEGMENT_SECONDS = int(os.getenv("SOC_SEGMENT_SECONDS", "3600"))
+SOC_RETENTION_DAYS = float(os.getenv("SOC_RETENTION_DAYS", "7"))
+SOC_LOG_FSYNC = os.getenv("SOC_LOG_FSYNC", "0") == "1"
+
+# A module is ACTIVE in /soc/soc-status if it logged within this window
+SOC_ACTIVE_SECONDS = int(os.getenv("SOC_ACTIVE_SECONDS", "60"))
+
+# Threat scoring: failures per client (IP or user_id) within the sliding
+# window before it is blocked, and for how long
+THREAT_WINDOW_SECONDS = int(os.getenv("THREAT_WINDOW_SECONDS", "60"))
+THREAT_MAX_FAILURES = int(os.getenv("THREAT_MAX_FAILURES", "10"))
+THREAT_BLOCK_SECONDS = int(os.getenv("THREAT_BLOCK_SECONDS", "300"))
+
+# Token bucket per client on the guarded endpoints (requests/s, burst)
+THREAT_RATE = float(os.getenv("THREAT_RATE", "20"))
+THREAT_BURST = float(os.getenv("THREAT_BURST", "40"))
+
+# Rejected requests are summed into one ATTACK_BLOCKED event per interval
+THREAT_REPORT_SECONDS = int(os.getenv("THREAT_REPORT_SECONDS", "10"))
+
+# Tracked clients (least recently seen are forgotten first)
+THREAT_MAX_CLIENTS = int(os.getenv("THREAT_MAX_CLIENTS", "100000"))
+
+# Path prefixes whose requests must carry a body signature (X-Signature,
+# X-Nonce, X-Timestamp); comma-separated, empty turns the middleware off
+HMAC_SIGNED_PREFIXES = [
+    p.strip() for p in os.getenv("HMAC_SIGNED_PREFIXES", "/hmac/signed").split(",") if p.strip()
+]
+
+# Upper bound on requests per /attack-campaign run
+CAMPAIGN_MAX_REQUESTS = int(os.getenv("CAMPAIGN_MAX_REQUESTS", "20000"))
+
+# On-demand sampling profiler at /metrics/profile (off unless "1")
+METRICS_PROFILER = os.getenv("METRICS_PROFILER", "0") == "1"
+METRICS_PROFILE_MAX_SECONDS = float(os.getenv("METRICS_PROFILE_MAX_SECONDS", "30"))
@@ -0,0 +1,180 @@
+import json
+from typing import Dict, List, Optional, Sequence
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.security import begin_signed_request, finish_signed_request
+from app.soc_store import emit_event
+from app.threat import ThreatBlockedError, client_keys, current_threats
+
+# ===============================
+# SIGNED REQUEST MIDDLEWARE
+# ===============================
+# Requests under the configured path prefixes must carry
+#   X-Signature  hex HMAC-SHA256 of "METHOD|path?query|nonce|timestamp|" + body
+#   X-Nonce, X-Timestamp, and optionally X-Key-Id / X-Tenant
+# Headers are checked before the route runs (401 otherwise). The body is
+# hashed chunk by chunk as the route reads it, never buffered, and the
+# signature is checked on the last chunk. Until then, whatever the route
+# sends is held back and only let out each time it asks for more body, so
+# a route answering while it reads (full-duplex clients only) still
+# streams, with at most one chunk held. On a bad signature:
+#   - response not started yet  -> client gets 401
+#   - response already streaming -> it is aborted, so the client sees a
+#     truncated transfer
+# A route that answers without reading the whole body has its response
+# held until the rest has been drained and verified.
+
+
+class SignatureError(Exception):
+    pass
+
+
+class SignedBody:
+    def __init__(self, receive: Receive, send: Send, mac, signature: str, nonce: str, ts: int):
+        self._receive = receive
+        self._send = send
+        self._mac = mac
+        self._signature = signature
+        self._nonce = nonce
+        self._ts = ts
+
+        self.done = False                  # whole body hashed and verified
+        self.failed: Optional[str] = None  # why verification failed
+        self.started = False               # response start forwarded
+        self._held: List[Message] = []
+
+    async def _next(self) -> Message:
+        message = await self._receive()
+        if message["type"] == "http.request":
+            self._mac.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                try:
+                    finish_signed_request(self._mac, self._signature, self._nonce, self._ts)
+                except ValueError as e:
+                    self.failed = str(e)
+                    raise SignatureError(self.failed)
+                self.done = True
+        return message
+
+    async def receive(self) -> Message:
+        if self.failed:
+            raise SignatureError(self.failed)
+        if self.done:
+            return await self._receive()
+        await self.release()
+        return await self._next()
+
+    async def send(self, message: Message) -> None:
+        if self.failed:
+            return
+        if self.done:
+            await self._forward(message)
+        else:
+            self._held.append(message)
+
+    async def drain(self) -> None:
+        """Hash (and discard) whatever body the route did not read."""
+        while not self.done and self.failed is None:
+            message = await self._next()
+            if message["type"] == "http.disconnect":
+                self.failed = "Client disconnected before the body was verified"
+                raise SignatureError(self.failed)
+
+    async def release(self) -> None:
+        held, self._held = self._held, []
+        for message in held:
+            await self._forward(message)
+
+    async def _forward(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.started = True
+        await self._send(message)
+
+
+class HMACSigningMiddleware:
+    def __init__(self, app: ASGIApp, prefixes: Sequence[str] = ()):
+        self.app = app
+        self.prefixes = tuple(p for p in prefixes if p)
+
+    def _protected(self, path: str) -> bool:
+        return any(path == p or path.startswith(p.rstrip("/") + "/") for p in self.prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._protected(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        headers = request.headers
+        clients = client_keys(request)
+        path = scope["path"]
+
+        try:
+            current_threats().check(clients)
+        except ThreatBlockedError as e:
+            await reject(send, 429, str(e), {"Retry-After": str(e.retry_after)})
+            return
+
+        signature = headers.get("x-signature")
+        nonce = headers.get("x-nonce")
+        timestamp = headers.get("x-timestamp")
+        if not (signature and nonce and timestamp):
+            reason = "Missing X-Signature, X-Nonce or X-Timestamp"
+            rejected(clients, reason, path)
+            await reject(send, 401, reason)
+            return
+
+        target = path
+        if scope.get("query_string"):
+            target += "?" + scope["query_string"].decode("latin-1")
+
+        try:
+            mac, ts = begin_signed_request(
+                scope["method"], target, nonce, timestamp,
+                headers.get("x-key-id"), headers.get("x-tenant")
+            )
+        except ValueError as e:
+            rejected(clients, str(e), path)
+            await reject(send, 401, str(e))
+            return
+
+        body = SignedBody(receive, send, mac, signature, nonce, ts)
+
+        try:
+            await self.app(scope, body.receive, body.send)
+            await body.drain()
+        except Exception:
+            # The route may have wrapped SignatureError in its own error
+            if body.failed is None:
+                raise
+
+        if body.failed is not None:
+            rejected(clients, body.failed, path)
+            if body.started:
+                # Already streaming: abort so the client gets a broken transfer
+                raise SignatureError(body.failed)
+            await reject(send, 401, body.failed)
+            return
+
+        await body.release()
+
+
+def rejected(clients, reason: str, path: str) -> None:
+    current_threats().fail(clients)
+    emit_event(
+        event_type="HMAC_ATTACK_BLOCKED",
+        message=f"Signed request rejected: {reason}",
+        meta={"module": "hmac", "level": "danger", "path": path}
+    )
+
+
+async def reject(send: Send, status: int, detail: str,
+                 headers: Optional[Dict[str, str]] = None) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    raw = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    raw += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": body})
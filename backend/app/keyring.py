@@ -0,0 +1,173 @@
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from app.config import (
+    AES_KEY,
+    AES_KEYS,
+    AES_ACTIVE_KEY_ID,
+    HMAC_SECRET,
+    HMAC_KEYS,
+    HMAC_ACTIVE_KEY_ID,
+    KEY_CACHE_SIZE
+)
+
+DEFAULT_KEY_ID = "default"
+
+# Accepted raw key lengths per purpose (HMAC takes any non-empty key)
+KEY_SIZES = {"aes": (16, 24, 32)}
+
+# ===============================
+# KEY RING
+# ===============================
+# Holds every key id that may still appear on ciphertexts or signatures.
+# Rotation only changes which id new output uses. Per-tenant keys are
+# derived with HKDF, and the ready-to-use AESGCM / keyed HMAC objects are
+# kept in an LRU so a request never pays for key setup.
+
+class KeyRing:
+    def __init__(self, purpose: str, keys: Dict[str, bytes], active: str,
+                 cache_size: int = KEY_CACHE_SIZE):
+        if active not in keys:
+            raise ValueError(f"Active key id {active!r} is not in the {purpose} key ring")
+        for key_id, key in keys.items():
+            check_key(purpose, key_id, key)
+
+        self.purpose = purpose
+        self.cache_size = cache_size
+
+        self._keys = dict(keys)
+        self._active = active
+        self._cache: "OrderedDict[Tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def active_id(self) -> str:
+        return self._active
+
+    def key_ids(self):
+        return list(self._keys)
+
+    def key(self, key_id: Optional[str] = None, tenant: Optional[str] = None) -> bytes:
+        key_id = key_id or self._active
+        try:
+            master = self._keys[key_id]
+        except KeyError:
+            raise ValueError(f"Unknown key id: {key_id}")
+
+        if not tenant:
+            return master
+
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=len(master),
+            salt=None,
+            info=f"cryptoguard/{self.purpose}/{key_id}/{tenant}".encode()
+        ).derive(master)
+
+    def _cached(self, kind: str, key_id: Optional[str], tenant: Optional[str], build):
+        key_id = key_id or self._active
+        slot = (kind, key_id, tenant or "")
+
+        with self._lock:
+            obj = self._cache.get(slot)
+            if obj is not None:
+                self._cache.move_to_end(slot)
+                self.hits += 1
+                return key_id, obj
+
+        obj = build(self.key(key_id, tenant))
+
+        with self._lock:
+            self.misses += 1
+            self._cache[slot] = obj
+            self._cache.move_to_end(slot)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return key_id, obj
+
+    def aes(self, key_id: Optional[str] = None, tenant: Optional[str] = None) -> Tuple[str, AESGCM]:
+        return self._cached("aes", key_id, tenant, AESGCM)
+
+    def hmac(self, key_id: Optional[str] = None, tenant: Optional[str] = None):
+        """Pre-keyed HMAC-SHA256 state. Callers must .copy() before update()."""
+        return self._cached(
+            "hmac", key_id, tenant,
+            lambda key: hmac.new(key, digestmod=hashlib.sha256)
+        )
+
+    def add(self, key_id: str, key: bytes) -> None:
+        check_key(self.purpose, key_id, key)
+        with self._lock:
+            self._keys[key_id] = key
+            self._drop(key_id)
+
+    def rotate(self, key_id: str, key: Optional[bytes] = None) -> None:
+        """Make key_id active. Older ids stay valid until retired."""
+        if key is not None:
+            self.add(key_id, key)
+        if key_id not in self._keys:
+            raise ValueError(f"Unknown key id: {key_id}")
+        self._active = key_id
+
+    def retire(self, key_id: str) -> None:
+        if key_id == self._active:
+            raise ValueError("Cannot retire the active key")
+        with self._lock:
+            self._keys.pop(key_id, None)
+            self._drop(key_id)
+
+    def _drop(self, key_id: str) -> None:
+        for slot in [s for s in self._cache if s[1] == key_id]:
+            del self._cache[slot]
+
+    def stats(self) -> Dict:
+        return {
+            "purpose": self.purpose,
+            "active": self._active,
+            "key_ids": self.key_ids(),
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# ===============================
+# LOADING
+# ===============================
+
+def check_key(purpose: str, key_id: str, key: bytes) -> None:
+    sizes = KEY_SIZES.get(purpose)
+    if sizes and len(key) not in sizes:
+        expected = ", ".join(map(str, sizes))
+        raise ValueError(
+            f"{purpose} key {key_id!r} is {len(key)} bytes, expected one of {expected}"
+        )
+
+
+def parse_keys(spec: str) -> Dict[str, bytes]:
+    keys = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        key_id, sep, secret = entry.partition(":")
+        if not sep or not key_id or not secret:
+            raise ValueError(f"Invalid key ring entry: {entry!r}")
+        keys[key_id] = secret.encode()
+    return keys
+
+
+def load_ring(purpose: str, spec: str, active: str, fallback: bytes) -> KeyRing:
+    keys = parse_keys(spec) or {DEFAULT_KEY_ID: fallback}
+    return KeyRing(purpose, keys, active or next(reversed(keys)))
+
+
+aes_keys = load_ring("aes", AES_KEYS, AES_ACTIVE_KEY_ID, AES_KEY)
+hmac_keys = load_ring("hmac", HMAC_KEYS, HMAC_ACTIVE_KEY_ID, HMAC_SECRET.encode())
@@ -1,8 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import argon2, aes, hmac, attack
 from app.routes import soc
 from app.routes import ws
+from app.routes import metrics
+from app.threat import ThreatBlockedError
+from app.hmac_middleware import HMACSigningMiddleware
+from app.metrics import MetricsMiddleware
+from app.config import HMAC_SIGNED_PREFIXES
 
 
 app = FastAPI(
@@ -10,6 +16,13 @@ app = FastAPI(
     version="1.0"
 )
 
+# Body signatures on HMAC_SIGNED_PREFIXES (added first so CORS wraps it)
+app.add_middleware(HMACSigningMiddleware, prefixes=HMAC_SIGNED_PREFIXES)
+
+# Request counters / latency by route (outside the signing middleware,
+# so its 401s are counted too)
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
@@ -18,12 +31,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Threat scoring rejects abusive clients before any crypto runs
+@app.exception_handler(ThreatBlockedError)
+async def threat_blocked(request: Request, exc: ThreatBlockedError):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 app.include_router(argon2.router)
 app.include_router(aes.router)
 app.include_router(hmac.router)
 app.include_router(attack.router)
 app.include_router(soc.router)
 app.include_router(ws.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -0,0 +1,346 @@
+import bisect
+import sys
+import threading
+import time
+from collections import Counter as TallyCounter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# ===============================
+# METRIC PRIMITIVES
+# ===============================
+# Pre-aggregated in process and rendered in Prometheus text format on
+# /metrics. Recording is a dict lookup plus an add under a lock; histogram
+# buckets are found by bisect and only made cumulative when scraped.
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_num(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def time(self, labels: Labels = ()) -> "Timer":
+        return Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+
+        lines = self.header()
+        for labels, counts, total in items:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {running}")
+        return lines
+
+
+class Timer:
+    """with HISTOGRAM.time(("op",)): ... -- observes elapsed seconds."""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class GaugeFunc(Metric):
+    """Read at scrape time: fn() returns a number or {label values: number}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_num(v)}" for labels, v in items
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ===============================
+# CRYPTO HOT PATHS
+# ===============================
+
+CRYPTO_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+CRYPTO_SECONDS = REGISTRY.register(Histogram(
+    "cryptoguard_crypto_seconds",
+    "Time spent in a crypto operation (argon2_hash, argon2_verify, aes_encrypt, aes_decrypt, hmac_verify)",
+    ("op",),
+    CRYPTO_BUCKETS
+))
+
+CRYPTO_FAILURES = REGISTRY.register(Counter(
+    "cryptoguard_crypto_failures_total",
+    "Crypto operations that rejected their input (bad tag, bad signature, replay, ...)",
+    ("op",)
+))
+
+# ===============================
+# HTTP
+# ===============================
+
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "cryptoguard_http_requests_total",
+    "HTTP requests by route template, method and status",
+    ("route", "method", "status")
+))
+
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "cryptoguard_http_request_seconds",
+    "HTTP request duration until the response is complete",
+    ("route", "method"),
+    HTTP_BUCKETS
+))
+
+HTTP_INFLIGHT = [0]
+
+REGISTRY.register(GaugeFunc(
+    "cryptoguard_http_requests_inflight",
+    "HTTP requests currently being handled",
+    lambda: HTTP_INFLIGHT[0]
+))
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_INFLIGHT[0] += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_INFLIGHT[0] -= 1
+            # Route template (not the raw path) keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_SECONDS.observe(time.perf_counter() - start, (route, method))
+            HTTP_REQUESTS.inc((route, method, str(status[0])))
+
+# ===============================
+# WEBSOCKET
+# ===============================
+
+WS_SEND_SECONDS = REGISTRY.register(Histogram(
+    "cryptoguard_ws_send_seconds",
+    "Time to send one batched frame to a dashboard client",
+    (),
+    HTTP_BUCKETS
+))
+
+# ===============================
+# GAUGES (READ AT SCRAPE TIME)
+# ===============================
+# Imported lazily: these modules import this one.
+
+def _nonce_store_size():
+    from app import security
+    return len(security.USED_NONCES)
+
+def _soc_buffer():
+    from app.soc_store import SOC_EVENTS
+    return {("used",): len(SOC_EVENTS), ("capacity",): SOC_EVENTS.capacity}
+
+def _soc_pipeline():
+    from app.soc_store import SOC_PIPELINE
+    stats = SOC_PIPELINE.stats()
+    return {(k,): stats[k] for k in ("queued", "emitted", "dropped", "processed")}
+
+def _argon2_pool():
+    from app.argon2_pool import argon2_pool
+    stats = argon2_pool.stats()
+    return {(k,): stats[k] for k in ("workers", "queue_depth", "inflight", "queued", "rejected")}
+
+def _threadpool():
+    # Starlette runs sync endpoints on anyio's default thread limiter
+    import anyio.to_thread
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {("busy",): limiter.borrowed_tokens, ("total",): limiter.total_tokens}
+
+def _ws():
+    from app.ws_manager import ws_manager
+    stats = ws_manager.stats()
+    return {(k,): stats[k] for k in ("clients", "queued", "dropped", "published", "disconnected")}
+
+def _threats():
+    from app.threat import THREATS
+    stats = THREATS.stats()
+    return {(k,): stats[k] for k in ("clients", "blocked", "rate_limited", "rejected_blocked", "blocks")}
+
+
+for _name, _help, _fn, _labels_ in (
+    ("cryptoguard_nonce_store_size", "Nonces held for replay protection", _nonce_store_size, ()),
+    ("cryptoguard_soc_buffer_events", "SOC ring buffer fill", _soc_buffer, ("state",)),
+    ("cryptoguard_soc_pipeline", "SOC event pipeline counters", _soc_pipeline, ("stat",)),
+    ("cryptoguard_argon2_pool", "Argon2 worker pool occupancy", _argon2_pool, ("stat",)),
+    ("cryptoguard_threadpool_threads", "Sync endpoint threadpool saturation", _threadpool, ("state",)),
+    ("cryptoguard_ws", "WebSocket fan-out", _ws, ("stat",)),
+    ("cryptoguard_threats", "Threat scoring", _threats, ("stat",)),
+):
+    REGISTRY.register(GaugeFunc(_name, _help, _fn, _labels_))
+
+# ===============================
+# SAMPLING PROFILER (OPTIONAL)
+# ===============================
+# Samples every thread's stack at `hz` for a while and returns folded
+# stacks ("frame;frame;frame count"), ready for flamegraph tools. Only
+# runs on demand and only when METRICS_PROFILER=1.
+
+class SamplingProfiler:
+    def __init__(self, max_depth: int = 64):
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def _fold(self, frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def sample(self, seconds: float, hz: float,
+               skip: Iterable[int] = ()) -> Optional[TallyCounter]:
+        """None if another profile is already running."""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            stacks: TallyCounter = TallyCounter()
+            skip = set(skip) | {threading.get_ident()}
+            interval = 1.0 / hz
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident not in skip:
+                        stacks[self._fold(frame)] += 1
+                time.sleep(interval)
+            return stacks
+        finally:
+            self._lock.release()
+
+
+PROFILER = SamplingProfiler()
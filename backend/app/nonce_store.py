@@ -0,0 +1,227 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from app.config import NONCE_BACKEND, NONCE_DB_PATH
+
+# ===============================
+# REPLAY NONCE STORE
+# ===============================
+# Nonces are grouped into time buckets keyed by the moment they stop
+# mattering. A request is only accepted while its timestamp is inside the
+# freshness window, so once that moment has passed a replay is rejected as
+# stale anyway and the whole bucket can be dropped in one go.
+
+class NonceStore:
+    def __init__(self, window: int = 30, bucket_seconds: int = 10, margin: int = 5):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.margin = margin
+
+        self._buckets: Dict[int, Set[str]] = {}
+        self._oldest: Optional[int] = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.added = 0
+        self.evicted = 0
+        self.evicted_buckets = 0
+
+    def _bucket_for(self, timestamp: int) -> int:
+        # A nonce signed at `timestamp` stays valid until timestamp + window
+        expires_at = timestamp + self.window + self.margin
+        return expires_at // self.bucket_seconds
+
+    def _expire(self, now: int) -> None:
+        if self._oldest is None:
+            return
+
+        current = now // self.bucket_seconds
+        # Every bucket strictly before `current` has fully expired
+        while self._oldest < current:
+            bucket = self._buckets.pop(self._oldest, None)
+            if bucket:
+                self._size -= len(bucket)
+                self.evicted += len(bucket)
+                self.evicted_buckets += 1
+            self._oldest += 1
+
+            if not self._buckets:
+                self._oldest = None
+                return
+
+    def seen(self, nonce: str, now: Optional[int] = None) -> bool:
+        now = int(time.time()) if now is None else now
+
+        with self._lock:
+            self._expire(now)
+            # Bounded by (2 * window + margin) / bucket_seconds live buckets
+            return any(nonce in bucket for bucket in self._buckets.values())
+
+    def add(self, nonce: str, timestamp: int, now: Optional[int] = None) -> bool:
+        """Record a nonce. Returns False if it was already present."""
+        now = int(time.time()) if now is None else now
+        key = self._bucket_for(timestamp)
+
+        with self._lock:
+            self._expire(now)
+
+            if any(nonce in bucket for bucket in self._buckets.values()):
+                return False
+
+            self._buckets.setdefault(key, set()).add(nonce)
+            if self._oldest is None or key < self._oldest:
+                self._oldest = key
+
+            self._size += 1
+            self.added += 1
+            return True
+
+    def __contains__(self, nonce: str) -> bool:
+        return self.seen(nonce)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._oldest = None
+            self._size = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._expire(int(time.time()))
+            return {
+                "backend": "memory",
+                "size": self._size,
+                "buckets": len(self._buckets),
+                "added": self.added,
+                "evicted": self.evicted,
+                "evicted_buckets": self.evicted_buckets,
+                "window": self.window,
+                "bucket_seconds": self.bucket_seconds
+            }
+
+
+# ===============================
+# SHARED NONCE STORE (MULTI-WORKER)
+# ===============================
+# Every uvicorn worker on the host opens the same SQLite file in WAL mode.
+# The nonce is the primary key, so "check and insert" is a single atomic
+# statement no matter which worker the replay lands on.
+
+class SQLiteNonceStore:
+    def __init__(
+        self,
+        path: str,
+        window: int = 30,
+        margin: int = 5,
+        purge_interval: int = 10
+    ):
+        self.path = path
+        self.window = window
+        self.margin = margin
+        self.purge_interval = purge_interval
+
+        self._local = threading.local()
+        self._next_purge = 0
+
+        self.added = 0
+        self.evicted = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS nonces ("
+            " nonce TEXT PRIMARY KEY,"
+            " expires_at INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS nonces_expires ON nonces (expires_at)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threadpool threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _expire(self, now: int) -> None:
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+
+        cur = self._conn().execute(
+            "DELETE FROM nonces WHERE expires_at <= ?", (now,)
+        )
+        self.evicted += max(cur.rowcount, 0)
+
+    def seen(self, nonce: str, now: Optional[int] = None) -> bool:
+        now = int(time.time()) if now is None else now
+        row = self._conn().execute(
+            "SELECT 1 FROM nonces WHERE nonce = ? AND expires_at > ?",
+            (nonce, now)
+        ).fetchone()
+        return row is not None
+
+    def add(self, nonce: str, timestamp: int, now: Optional[int] = None) -> bool:
+        """Record a nonce. Returns False if it was already present."""
+        now = int(time.time()) if now is None else now
+        expires_at = timestamp + self.window + self.margin
+
+        self._expire(now)
+
+        # Insert, or take over a row that has expired but not been purged yet
+        cur = self._conn().execute(
+            "INSERT INTO nonces (nonce, expires_at) VALUES (?, ?) "
+            "ON CONFLICT (nonce) DO UPDATE SET expires_at = excluded.expires_at "
+            "WHERE nonces.expires_at <= ?",
+            (nonce, expires_at, now)
+        )
+        if cur.rowcount != 1:
+            return False
+
+        self.added += 1
+        return True
+
+    def __contains__(self, nonce: str) -> bool:
+        return self.seen(nonce)
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM nonces WHERE expires_at > ?",
+            (int(time.time()),)
+        ).fetchone()[0]
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM nonces")
+
+    def stats(self) -> Dict:
+        self._expire(int(time.time()))
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": len(self),
+            "added": self.added,
+            "evicted": self.evicted,
+            "window": self.window
+        }
+
+
+def create_nonce_store(window: int = 30):
+    if NONCE_BACKEND == "sqlite":
+        return SQLiteNonceStore(NONCE_DB_PATH, window=window)
+    if NONCE_BACKEND != "memory":
+        raise ValueError(f"Unknown NONCE_BACKEND: {NONCE_BACKEND}")
+    return NonceStore(window=window)
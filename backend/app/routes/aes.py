@@ -1,6 +1,28 @@
-from fastapi import APIRouter, HTTPException
-from app.security import encrypt_and_verify_aes, decrypt_and_verify_aes
-from app.soc_store import log_event
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import base64, binascii, json, tempfile
+
+from app.security import (
+    encrypt_and_verify_aes,
+    decrypt_and_verify_aes,
+    encrypt_bytes,
+    decrypt_bytes
+)
+from app.keyring import aes_keys
+from app.aes_stream import MAX_CHUNK_SIZE, StreamEncryptor, StreamDecryptor
+from app.config import (
+    AES_MAX_BODY_MB,
+    AES_BATCH_MAX,
+    AES_BATCH_MAX_MB,
+    AES_STREAM_CHUNK_KB,
+    AES_STREAM_SPOOL_MB,
+    AES_STREAM_MAX_MB
+)
+from app.soc_store import emit_event
+from app.threat import client_keys, current_threats
 
 router = APIRouter()
 
@@ -12,7 +34,7 @@ def aes_encrypt(data: str):
     result = encrypt_and_verify_aes(data)
 
     # ✅ SOC EVENT
-    log_event(
+    emit_event(
         event_type="AES_ENCRYPT_SUCCESS",
         message="AES-256-GCM encryption completed",
         meta={
@@ -27,12 +49,16 @@ def aes_encrypt(data: str):
 # DECRYPT
 # ===============================
 @router.post("/aes-decrypt")
-def aes_decrypt(ciphertext: str, nonce: str):
+def aes_decrypt(request: Request, ciphertext: str, nonce: str, key_id: Optional[str] = None):
+    # Blocked / rate-limited clients never reach GCM
+    clients = client_keys(request)
+    current_threats().check(clients)
+
     try:
-        result = decrypt_and_verify_aes(ciphertext, nonce)
+        result = decrypt_and_verify_aes(ciphertext, nonce, key_id)
 
         # ✅ SOC EVENT (success)
-        log_event(
+        emit_event(
             event_type="AES_DECRYPT_SUCCESS",
             message="AES-256-GCM decryption verified",
             meta={
@@ -44,8 +70,10 @@ def aes_decrypt(ciphertext: str, nonce: str):
         return result
 
     except ValueError:
+        current_threats().fail(clients)
+
         # ✅ SOC EVENT (attack detected)
-        log_event(
+        emit_event(
             event_type="AES_TAMPER_DETECTED",
             message="AES integrity verification failed",
             meta={
@@ -58,3 +86,355 @@ def aes_decrypt(ciphertext: str, nonce: str):
             status_code=400,
             detail="Integrity verification failed"
         )
+
+# ===============================
+# REQUEST-BODY API (RAW / BASE64)
+# ===============================
+# application/octet-stream -> raw bytes in, raw bytes out, nonce and key
+#                             id in X-Nonce / X-Key-Id, tenant in X-Tenant
+# application/json         -> base64 fields in and out
+
+class EncryptBody(BaseModel):
+    data: str
+    tenant: Optional[str] = None
+
+class DecryptBody(BaseModel):
+    nonce: str
+    ciphertext: str
+    key_id: Optional[str] = None
+    tenant: Optional[str] = None
+
+def is_binary(request: Request) -> bool:
+    return request.headers.get("content-type", "").startswith("application/octet-stream")
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+def unb64(value: str) -> bytes:
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid base64")
+
+MIB = 1024 * 1024
+
+# Below this, GCM takes less time than a hop to the threadpool
+OFFLOAD_BYTES = 64 * 1024
+
+async def read_body(request: Request, limit_mb: int = AES_MAX_BODY_MB,
+                    hint: str = ", use /aes/stream") -> bytes:
+    limit = limit_mb * MIB
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > limit:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Body exceeds {limit_mb} MiB{hint}"
+            )
+    return bytes(body)
+
+# Same cap as raw bodies, plus room for base64 (4/3) and the JSON around it
+JSON_MAX_BODY_MB = AES_MAX_BODY_MB * 4 // 3 + 1
+
+async def read_json(request: Request, model, limit_mb: int = JSON_MAX_BODY_MB):
+    body = await read_body(request, limit_mb)
+    try:
+        return model(**json.loads(body))
+    except (ValueError, TypeError, ValidationError):
+        raise HTTPException(status_code=422, detail="Invalid JSON body")
+
+async def run_crypto(fn, size: int, *args):
+    """Large payloads run on the threadpool so GCM never stalls the event loop."""
+    if size > OFFLOAD_BYTES:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+def log_tamper(count: int = 1):
+    emit_event(
+        event_type="AES_TAMPER_DETECTED",
+        message="AES integrity verification failed"
+        + (f" ({count} records)" if count > 1 else ""),
+        meta={
+            "module": "attack",
+            "level": "danger"
+        }
+    )
+
+@router.post("/aes/encrypt")
+async def aes_encrypt_body(request: Request):
+    if is_binary(request):
+        data = await read_body(request)
+        tenant = request.headers.get("x-tenant")
+    else:
+        body = await read_json(request, EncryptBody)
+        data, tenant = unb64(body.data), body.tenant
+
+    key_id, nonce, ciphertext = await run_crypto(encrypt_bytes, len(data), data, tenant)
+
+    emit_event(
+        event_type="AES_ENCRYPT_SUCCESS",
+        message="AES-256-GCM encryption completed",
+        meta={
+            "module": "aes",
+            "level": "success"
+        }
+    )
+
+    if is_binary(request):
+        return Response(
+            ciphertext,
+            media_type="application/octet-stream",
+            headers={"X-Nonce": b64(nonce), "X-Key-Id": key_id}
+        )
+
+    return {
+        "algorithm": "AES-256-GCM",
+        "status": "Encrypted",
+        "key_id": key_id,
+        "nonce": b64(nonce),
+        "ciphertext": b64(ciphertext)
+    }
+
+@router.post("/aes/decrypt")
+async def aes_decrypt_body(request: Request):
+    # Blocked / rate-limited clients never reach GCM
+    clients = client_keys(request)
+    current_threats().check(clients)
+
+    if is_binary(request):
+        if "x-nonce" not in request.headers:
+            raise HTTPException(status_code=400, detail="Missing X-Nonce header")
+        nonce = unb64(request.headers["x-nonce"])
+        ciphertext = await read_body(request)
+        key_id = request.headers.get("x-key-id")
+        tenant = request.headers.get("x-tenant")
+    else:
+        body = await read_json(request, DecryptBody)
+        nonce, ciphertext = unb64(body.nonce), unb64(body.ciphertext)
+        key_id, tenant = body.key_id, body.tenant
+
+    try:
+        plaintext = await run_crypto(decrypt_bytes, len(ciphertext), nonce, ciphertext, key_id, tenant)
+    except ValueError:
+        current_threats().fail(clients)
+        log_tamper()
+        raise HTTPException(
+            status_code=400,
+            detail="Integrity verification failed"
+        )
+
+    emit_event(
+        event_type="AES_DECRYPT_SUCCESS",
+        message="AES-256-GCM decryption verified",
+        meta={
+            "module": "aes",
+            "level": "success"
+        }
+    )
+
+    if is_binary(request):
+        return Response(plaintext, media_type="application/octet-stream")
+
+    return {
+        "algorithm": "AES-256-GCM",
+        "status": "Verified",
+        "plaintext": b64(plaintext)
+    }
+
+# ===============================
+# BATCH (ONE CALL, MANY RECORDS)
+# ===============================
+class BatchRecord(BaseModel):
+    data: Optional[str] = None        # encrypt
+    nonce: Optional[str] = None       # decrypt
+    ciphertext: Optional[str] = None  # decrypt
+    key_id: Optional[str] = None      # decrypt, defaults to the active key
+
+class BatchBody(BaseModel):
+    op: str
+    records: List[BatchRecord]
+    tenant: Optional[str] = None
+
+@router.post("/aes/batch")
+async def aes_batch(request: Request):
+    clients = client_keys(request)
+    current_threats().check(clients)
+
+    # Size-capped before parsing: the record count alone bounds nothing
+    body = await read_json(request, BatchBody, AES_BATCH_MAX_MB)
+
+    if body.op not in ("encrypt", "decrypt"):
+        raise HTTPException(status_code=400, detail="op must be encrypt or decrypt")
+    if len(body.records) > AES_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {AES_BATCH_MAX} records")
+
+    result = await run_in_threadpool(run_batch, body)
+
+    # Each record that failed its tag counts against the client
+    if result["failed"] and body.op == "decrypt":
+        current_threats().fail(clients, result["failed"])
+
+    return result
+
+def run_batch(body: BatchBody) -> dict:
+    results = []
+    failed = 0
+
+    # Every record goes through the same cached AESGCM context
+    for record in body.records:
+        try:
+            if body.op == "encrypt":
+                if record.data is None:
+                    raise ValueError("Missing data")
+                key_id, nonce, ciphertext = encrypt_bytes(unb64(record.data), body.tenant)
+                results.append({
+                    "key_id": key_id,
+                    "nonce": b64(nonce),
+                    "ciphertext": b64(ciphertext)
+                })
+            else:
+                if record.nonce is None or record.ciphertext is None:
+                    raise ValueError("Missing nonce or ciphertext")
+                plaintext = decrypt_bytes(
+                    unb64(record.nonce),
+                    unb64(record.ciphertext),
+                    record.key_id,
+                    body.tenant
+                )
+                results.append({"plaintext": b64(plaintext)})
+        except (ValueError, HTTPException) as e:
+            failed += 1
+            results.append({"error": getattr(e, "detail", None) or str(e)})
+
+    # One SOC event per batch, not per record
+    emit_event(
+        event_type="AES_ENCRYPT_SUCCESS" if body.op == "encrypt" else "AES_DECRYPT_SUCCESS",
+        message=f"AES-256-GCM batch {body.op}: {len(results) - failed}/{len(results)} records",
+        meta={
+            "module": "aes",
+            "level": "success"
+        }
+    )
+    if failed and body.op == "decrypt":
+        log_tamper(failed)
+
+    return {
+        "algorithm": "AES-256-GCM",
+        "op": body.op,
+        "count": len(results),
+        "failed": failed,
+        "results": results
+    }
+
+# ===============================
+# STREAMING (SEGMENTED AEAD)
+# ===============================
+# The body is processed chunk by chunk as it arrives and the output is
+# spooled (in memory up to AES_STREAM_SPOOL_MB, then to a temp file). It
+# is only sent once the whole body has been read: most HTTP/1.1 clients
+# do not read the response before they finish uploading, so answering
+# while reading would deadlock them. Memory stays at one chunk plus the
+# spool threshold, and a tampered stream gets a clean 400 because nothing
+# has been sent yet.
+
+async def spool_stream(request: Request, update, finalize, header: bytes = b""):
+    limit = AES_STREAM_MAX_MB * MIB
+    spool = tempfile.SpooledTemporaryFile(max_size=AES_STREAM_SPOOL_MB * MIB)
+    spool.write(header)
+
+    def feed(data: Optional[bytes]) -> None:
+        out = finalize() if data is None else update(data)
+        if out:
+            spool.write(out)
+
+    try:
+        received = 0
+        async for part in request.stream():
+            received += len(part)
+            if received > limit:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Stream exceeds {AES_STREAM_MAX_MB} MiB"
+                )
+            await run_crypto(feed, len(part), part)
+        # The last chunk can be up to a whole chunk in size
+        await run_in_threadpool(feed, None)
+    except BaseException:
+        spool.close()
+        raise
+
+    return spool
+
+def spooled_response(spool) -> StreamingResponse:
+    size = spool.tell()
+    spool.seek(0)
+
+    def chunks():
+        # Sync iterator: Starlette reads it on the threadpool
+        try:
+            while True:
+                block = spool.read(AES_STREAM_CHUNK_KB * 1024)
+                if not block:
+                    return
+                yield block
+        finally:
+            spool.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type="application/octet-stream",
+        headers={"Content-Length": str(size)}
+    )
+
+@router.post("/aes/stream/encrypt")
+async def aes_stream_encrypt(request: Request):
+    key_id, cipher = aes_keys.aes(tenant=request.headers.get("x-tenant"))
+    encryptor = StreamEncryptor(cipher, key_id, AES_STREAM_CHUNK_KB * 1024)
+
+    spool = await spool_stream(request, encryptor.update, encryptor.finalize, encryptor.header)
+
+    emit_event(
+        event_type="AES_ENCRYPT_SUCCESS",
+        message="AES-256-GCM stream encryption completed",
+        meta={
+            "module": "aes",
+            "level": "success"
+        }
+    )
+
+    return spooled_response(spool)
+
+@router.post("/aes/stream/decrypt")
+async def aes_stream_decrypt(request: Request):
+    clients = client_keys(request)
+    current_threats().check(clients)
+
+    tenant = request.headers.get("x-tenant")
+    # The key id comes from the stream header. Chunks are authenticated
+    # whole, so their size is capped: the client picks it
+    decryptor = StreamDecryptor(
+        lambda key_id: aes_keys.aes(key_id, tenant)[1],
+        max_chunk_size=max(MAX_CHUNK_SIZE, AES_STREAM_CHUNK_KB * 1024)
+    )
+
+    try:
+        spool = await spool_stream(request, decryptor.update, decryptor.finalize)
+    except ValueError:
+        current_threats().fail(clients)
+        log_tamper()
+        raise HTTPException(
+            status_code=400,
+            detail="Integrity verification failed"
+        )
+
+    emit_event(
+        event_type="AES_DECRYPT_SUCCESS",
+        message="AES-256-GCM stream decryption verified",
+        meta={
+            "module": "aes",
+            "level": "success"
+        }
+    )
+
+    return spooled_response(spool)
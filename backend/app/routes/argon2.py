@@ -1,36 +1,107 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
-import json, time
+from pydantic import BaseModel
+from typing import List, Optional
+import asyncio, json, time
 
-from app.security import hash_password_with_steps
-from app.soc_store import log_event
+from app.security import hash_password_with_steps, verify_password, ph
+from app.soc_store import emit_event
+from app.argon2_pool import argon2_pool, PoolBusyError
+from app.metrics import CRYPTO_SECONDS
+from app.config import ARGON2_STREAM_DELAY, ARGON2_BATCH_MAX
 
 router = APIRouter()
 
+# ===============================
+# DEDICATED POOL + BACKPRESSURE
+# ===============================
+def submit_hash(password: str, on_start=None) -> asyncio.Future:
+    return submit_job(hash_password_with_steps, password, on_start=on_start)
+
+def submit_job(fn, *args, on_start=None) -> asyncio.Future:
+    try:
+        return argon2_pool.submit(fn, *args, on_start=on_start)
+    except PoolBusyError as e:
+        emit_event(
+            event_type="ARGON2_POOL_SATURATED",
+            message="Argon2 request rejected (worker pool full)",
+            meta={
+                "module": "argon2",
+                "level": "warning"
+            }
+        )
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def hash_in_pool(password: str):
+    return await submit_hash(password)
+
 # ===============================
 # NORMAL (NON-STREAM)
 # ===============================
 @router.get("/argon2")
-def argon2_hash(password: str):
-    return hash_password_with_steps(password)
+async def argon2_hash(password: str):
+    return await hash_in_pool(password)
 
 # ===============================
 # STREAMING (SSE)
 # ===============================
+def sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
 @router.get("/argon2-stream")
-def argon2_stream(password: str):
+async def argon2_stream(password: str, request: Request):
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+
+    # Admission happens before the response starts so a full pool is a 503
+    future = submit_hash(
+        password,
+        on_start=lambda: loop.call_soon_threadsafe(started.set)
+    )
+    position = argon2_pool.stats()["queued"]
+
+    async def paced() -> bool:
+        """Wait ARGON2_STREAM_DELAY; False if the client went away."""
+        if ARGON2_STREAM_DELAY > 0:
+            await asyncio.sleep(ARGON2_STREAM_DELAY)
+        return not await request.is_disconnected()
+
+    async def stream():
+        began = time.perf_counter()
+        try:
+            yield sse({"step": "queued", "value": {"position": position}})
 
-    def stream():
-        result = hash_password_with_steps(password)
-        steps = result["steps"]
+            # Nothing is held between events: we only await the pool
+            waiter = asyncio.ensure_future(started.wait())
+            await asyncio.wait({waiter, future}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if await request.is_disconnected():
+                return
+            yield sse({"step": "hashing", "value": None})
 
-        yield f"data: {json.dumps({'step': 'salt', 'value': steps['salt']})}\n\n"
-        time.sleep(1)
+            result = await future
+            steps = result["steps"]
 
-        yield f"data: {json.dumps({'step': 'params', 'value': steps['params']})}\n\n"
-        time.sleep(1)
+            yield sse({"step": "salt", "value": steps["salt"]})
+            if not await paced():
+                return
 
-        yield f"data: {json.dumps({'step': 'hash', 'value': steps['hash']})}\n\n"
+            yield sse({"step": "params", "value": steps["params"]})
+            if not await paced():
+                return
+
+            yield sse({"step": "hash", "value": steps["hash"]})
+            yield sse({
+                "step": "done",
+                "value": {"elapsed_ms": round((time.perf_counter() - began) * 1000, 2)}
+            })
+        finally:
+            # Drops the job if it never reached a worker
+            future.cancel()
 
     return StreamingResponse(stream(), media_type="text/event-stream")
 
@@ -38,11 +109,11 @@ def argon2_stream(password: str):
 # DEMO API (USED BY UI)
 # ===============================
 @router.post("/argon2-demo")
-def argon2_demo(password: str):
-    result = hash_password_with_steps(password)
+async def argon2_demo(password: str):
+    result = await hash_in_pool(password)
 
     # ✅ CORRECT SOC EVENT
-    log_event(
+    emit_event(
         event_type="ARGON2_HASH_SUCCESS",
         message="Argon2 password hash generated",
         meta={
@@ -52,3 +123,119 @@ def argon2_demo(password: str):
     )
 
     return result
+
+# ===============================
+# VERIFY
+# ===============================
+class VerifyRequest(BaseModel):
+    password: str
+    hash: str
+    rehash: bool = False
+
+@router.post("/argon2/verify")
+async def argon2_verify(body: VerifyRequest):
+    try:
+        result = await submit_job(verify_password, body.password, body.hash, body.rehash)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    emit_event(
+        event_type="ARGON2_VERIFY_SUCCESS" if result["valid"] else "ARGON2_VERIFY_FAILED",
+        message="Argon2 password verified" if result["valid"] else "Argon2 password mismatch",
+        meta={
+            "module": "argon2",
+            "level": "success" if result["valid"] else "warning"
+        }
+    )
+
+    return result
+
+# ===============================
+# BULK HASH / VERIFY (NDJSON STREAM)
+# ===============================
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    password: str
+    hash: Optional[str] = None   # present -> verify, absent -> hash
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    rehash: bool = False
+
+def run_batch_item(item: BatchItem, rehash: bool) -> dict:
+    if item.hash is None:
+        with CRYPTO_SECONDS.time(("argon2_hash",)):
+            return {"op": "hash", "hash": ph.hash(item.password)}
+
+    result = verify_password(item.password, item.hash, rehash)
+    return {
+        "op": "verify",
+        "valid": result["valid"],
+        "needs_rehash": result["needs_rehash"],
+        **({"new_hash": result["new_hash"]} if "new_hash" in result else {})
+    }
+
+@router.post("/argon2/batch")
+async def argon2_batch(body: BatchRequest, request: Request):
+    if len(body.items) > ARGON2_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {ARGON2_BATCH_MAX} items"
+        )
+
+    async def stream():
+        # Batches share argon2_pool.batch_slots between them, so single
+        # requests still find room in the queue
+        counts = {"hashed": 0, "valid": 0, "invalid": 0, "needs_rehash": 0, "errors": 0}
+        processed = 0
+
+        async def one(index: int, item: BatchItem) -> dict:
+            future = await argon2_pool.submit_when_ready(run_batch_item, item, body.rehash)
+            try:
+                result = await future
+            except ValueError as e:
+                result = {"op": "verify", "error": str(e)}
+            return {"index": index, "id": item.id, **result}
+
+        tasks = [asyncio.ensure_future(one(i, item)) for i, item in enumerate(body.items)]
+        try:
+            # Results go out in completion order, not submission order
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                processed += 1
+
+                if "error" in line:
+                    counts["errors"] += 1
+                elif line["op"] == "hash":
+                    counts["hashed"] += 1
+                else:
+                    counts["valid" if line["valid"] else "invalid"] += 1
+                    counts["needs_rehash"] += line["needs_rehash"]
+
+                yield json.dumps(line) + "\n"
+
+                if await request.is_disconnected():
+                    return
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            # One aggregated SOC event per batch, not per password
+            emit_event(
+                event_type="ARGON2_BATCH_COMPLETED",
+                message=f"Argon2 batch processed {processed}/{len(tasks)} items",
+                meta={
+                    "module": "argon2",
+                    "level": "warning" if counts["invalid"] or counts["errors"] else "success",
+                    "counts": counts
+                }
+            )
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# ===============================
+# POOL METRICS
+# ===============================
+@router.get("/argon2-pool")
+def argon2_pool_status():
+    return argon2_pool.stats()
@@ -1,11 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 from app.security import (
     encrypt_and_verify_aes,
     decrypt_and_verify_aes,
-    verify_hmac_request
+    check_hmac_request,
+    hmac_state,
+    HMAC_WINDOW_SECONDS
 )
-from app.soc_store import log_event
+from app.nonce_store import NonceStore
+from app.attack_campaign import CampaignBusyError, run_campaign
+from app.config import CAMPAIGN_MAX_REQUESTS
+from app.soc_store import emit_event
 import time
+import uuid
 
 router = APIRouter()
 
@@ -30,41 +37,43 @@ def simulate_attack(attack_type: str):
         # HMAC REPLAY ATTACK
         # ===============================
         elif attack_type == "replay":
-            payload = {
-                "action": "ADMIN",
-                "user_id": "1",
-                "resource": "secure",
-                "nonce": "fixednonce123",
-                "timestamp": str(int(time.time())),
-                "signature": "fake"
-            }
+            # Private nonce store: the simulation never touches USED_NONCES
+            nonces = NonceStore(window=HMAC_WINDOW_SECONDS)
+            keyed = hmac_state()
+            now = int(time.time())
+
+            nonce = uuid.uuid4().hex[:12]
+            timestamp = str(now)
+            mac = keyed.copy()
+            mac.update(f"ADMIN|1|secure|{nonce}|{timestamp}".encode())
+            payload = ("ADMIN", "1", "secure", nonce, timestamp, mac.hexdigest())
 
             # First request (accepted)
-            try:
-                verify_hmac_request(**payload)
-            except:
-                pass
+            check_hmac_request(keyed, now, *payload, nonces=nonces)
 
             # Replay (must fail)
-            verify_hmac_request(**payload)
+            check_hmac_request(keyed, now, *payload, nonces=nonces)
 
         # ===============================
         # STALE TIMESTAMP
         # ===============================
         elif attack_type == "stale":
-            verify_hmac_request(
+            check_hmac_request(
+                hmac_state(),
+                int(time.time()),
                 "ADMIN",
                 "1",
                 "secure",
                 "nonce123",
                 str(int(time.time()) - 999),
-                "fake"
+                "fake",
+                nonces=NonceStore(window=HMAC_WINDOW_SECONDS)
             )
 
         return {"detected": False}
 
     except Exception as e:
-        log_event(
+        emit_event(
             event_type="ATTACK_BLOCKED",
             message=str(e),
             meta={
@@ -78,3 +87,40 @@ def simulate_attack(attack_type: str):
             "attack": attack_type,
             "reason": str(e)
         }
+
+
+# ===============================
+# ATTACK CAMPAIGN (CONCURRENT)
+# ===============================
+# Mixed legitimate + malicious traffic against the in-process app, with
+# private nonce / threat / SOC state. Only the summary reaches the SOC.
+@router.post("/attack-campaign")
+async def attack_campaign(
+    requests: int = Query(2000, ge=1, le=CAMPAIGN_MAX_REQUESTS),
+    concurrency: int = Query(50, ge=1, le=1000),
+    attack_ratio: float = Query(0.5, ge=0.0, le=1.0),
+    legit_clients: int = Query(200, ge=1, le=10000),
+    attackers: int = Query(5, ge=1, le=1000),
+    seed: Optional[int] = None
+):
+    try:
+        result = await run_campaign(requests, concurrency, attack_ratio, legit_clients, attackers, seed)
+    except CampaignBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    emit_event(
+        event_type="ATTACK_CAMPAIGN",
+        message=(
+            f"Campaign of {result['requests']} requests: "
+            f"{result['detection_rate']} detected, {result['false_positives']} false positives"
+        ),
+        meta={
+            "module": "attack",
+            "level": "warning" if result["false_positives"] else "info",
+            "detection_rate": result["detection_rate"],
+            "false_positive_rate": result["false_positive_rate"],
+            "throughput_rps": result["throughput_rps"]
+        }
+    )
+
+    return result
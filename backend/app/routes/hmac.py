@@ -1,18 +1,34 @@
-from fastapi import APIRouter, HTTPException
-from app.security import verify_hmac_request
-from app.soc_store import log_event
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from collections import Counter
+from typing import List, Optional
+import hashlib
+import json
+
+from app.security import verify_hmac_request, verify_hmac_batch
+from app.soc_store import emit_event
+from app.threat import ThreatBlockedError, client_keys, current_threats
+from app.config import HMAC_BATCH_MAX, HMAC_BATCH_MAX_MB
+from app.routes.aes import read_body
 
 router = APIRouter()
 
 @router.post("/hmac-demo")
 def hmac_demo(
+    request: Request,
     action: str,
     user_id: str,
     resource: str,
     nonce: str,
     timestamp: str,
-    signature: str
+    signature: str,
+    key_id: Optional[str] = None
 ):
+    # Blocked / rate-limited clients never reach the HMAC
+    clients = client_keys(request, user_id)
+    current_threats().check(clients)
+
     try:
         verify_hmac_request(
             action,
@@ -20,17 +36,19 @@ def hmac_demo(
             resource,
             nonce,
             timestamp,
-            signature
+            signature,
+            key_id
         )
     except ValueError as e:
-        log_event(
+        current_threats().fail(clients)
+        emit_event(
             event_type="HMAC_ATTACK_BLOCKED",
             message=str(e),
             meta={"module": "hmac", "level": "danger"}
         )
         raise HTTPException(status_code=401, detail=str(e))
 
-    log_event(
+    emit_event(
         event_type="HMAC_AUTH_SUCCESS",
         message="Critical API operation authenticated",
         meta={"module": "hmac", "level": "success"}
@@ -69,3 +87,153 @@ def hmac_demo(
             }
         ]
     }
+
+
+# ===============================
+# BATCH VERIFICATION (JSON / NDJSON)
+# ===============================
+class SignedEntry(BaseModel):
+    id: Optional[str] = None
+    action: str
+    user_id: str
+    resource: str
+    nonce: str
+    timestamp: str
+    signature: str
+
+def invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=422, detail=f"Invalid batch: {detail}")
+
+def too_many() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Batch exceeds {HMAC_BATCH_MAX} entries")
+
+def parse_entries(body: bytes, ndjson: bool) -> List[dict]:
+    if ndjson:
+        raw = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            # Stop at the cap instead of parsing the rest
+            if len(raw) == HMAC_BATCH_MAX:
+                raise too_many()
+            try:
+                raw.append(json.loads(line))
+            except ValueError:
+                raise invalid(f"entry {len(raw)} is not valid JSON")
+    else:
+        try:
+            raw = json.loads(body)
+        except ValueError:
+            raise invalid("body is not valid JSON")
+        if not isinstance(raw, list):
+            raise invalid("expected a JSON array")
+        if len(raw) > HMAC_BATCH_MAX:
+            raise too_many()
+
+    entries = []
+    for i, item in enumerate(raw):
+        if not isinstance(item, dict):
+            raise invalid(f"entry {i} must be a JSON object")
+        try:
+            entries.append(SignedEntry(**item).model_dump())
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            raise invalid(f"entry {i}: {field}: {error['msg']}")
+    return entries
+
+@router.post("/hmac/batch")
+async def hmac_batch(request: Request, key_id: Optional[str] = None):
+    clients = client_keys(request)
+    current_threats().check(clients)
+
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    # Size-capped read: the entry cap alone bounds nothing until parsed
+    entries = parse_entries(await read_body(request, HMAC_BATCH_MAX_MB, hint=""), ndjson)
+
+    # Entries from blocked users are rejected without verification
+    reasons: List[Optional[str]] = [None] * len(entries)
+    allowed = []
+    for i, entry in enumerate(entries):
+        try:
+            current_threats().check((("user", entry["user_id"]),), cost=0)
+            allowed.append(i)
+        except ThreatBlockedError as e:
+            reasons[i] = str(e)
+
+    # One keyed HMAC state for the whole batch, off the event loop
+    try:
+        verified_reasons = await run_in_threadpool(
+            verify_hmac_batch, [entries[i] for i in allowed], key_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+    failed_users = Counter()
+    for i, reason in zip(allowed, verified_reasons):
+        reasons[i] = reason
+        if reason is not None:
+            failed_users[entries[i]["user_id"]] += 1
+
+    if failed_users:
+        current_threats().fail(clients, sum(failed_users.values()))
+        for user_id, count in failed_users.items():
+            current_threats().fail((("user", user_id),), count)
+
+    rejected = Counter(r for r in reasons if r is not None)
+    verified = len(reasons) - sum(rejected.values())
+
+    # Aggregated SOC events instead of one per entry
+    if verified:
+        emit_event(
+            event_type="HMAC_AUTH_SUCCESS",
+            message=f"Batch of {verified} API operations authenticated",
+            meta={"module": "hmac", "level": "success", "count": verified}
+        )
+    if rejected:
+        emit_event(
+            event_type="HMAC_ATTACK_BLOCKED",
+            message=f"Batch rejected {sum(rejected.values())} requests",
+            meta={"module": "hmac", "level": "danger", "reasons": dict(rejected)}
+        )
+
+    return {
+        "count": len(entries),
+        "verified": verified,
+        "rejected": len(entries) - verified,
+        "results": [
+            {
+                "index": i,
+                "id": entry["id"],
+                "status": "Authenticated" if reason is None else "Rejected",
+                **({"reason": reason} if reason else {})
+            }
+            for i, (entry, reason) in enumerate(zip(entries, reasons))
+        ]
+    }
+
+
+# ===============================
+# SIGNED UPLOAD (HMAC MIDDLEWARE)
+# ===============================
+# Everything under /hmac/signed is verified by HMACSigningMiddleware while
+# the body streams in; by the time this returns, the upload is authentic.
+@router.post("/hmac/signed/upload")
+async def hmac_signed_upload(request: Request):
+    size = 0
+    digest = hashlib.sha256()
+    async for part in request.stream():
+        size += len(part)
+        digest.update(part)
+
+    emit_event(
+        event_type="HMAC_AUTH_SUCCESS",
+        message=f"Signed upload of {size} bytes authenticated",
+        meta={"module": "hmac", "level": "success", "bytes": size}
+    )
+
+    return {
+        "status": "Authenticated",
+        "bytes": size,
+        "sha256": digest.hexdigest()
+    }
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import REGISTRY, PROFILER
+from app.config import METRICS_PROFILER, METRICS_PROFILE_MAX_SECONDS
+
+router = APIRouter(tags=["Metrics"])
+
+# ===============================
+# PROMETHEUS SCRAPE
+# ===============================
+# async: the threadpool gauge must be read on the event loop
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+# ===============================
+# SAMPLING PROFILE (FOLDED STACKS)
+# ===============================
+@router.get("/metrics/profile", response_class=PlainTextResponse)
+async def metrics_profile(
+    seconds: float = Query(5.0, gt=0),
+    hz: float = Query(100.0, gt=0, le=1000),
+    limit: int = Query(200, ge=1, le=10000)
+):
+    if not METRICS_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler disabled (METRICS_PROFILER=1)")
+
+    seconds = min(seconds, METRICS_PROFILE_MAX_SECONDS)
+    stacks = await run_in_threadpool(PROFILER.sample, seconds, hz)
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    return PlainTextResponse(
+        "".join(f"{stack} {count}\n" for stack, count in stacks.most_common(limit))
+    )
@@ -1,25 +1,207 @@
-from fastapi import APIRouter
-from app.soc_store import get_events
+from fastapi import APIRouter, Query, Request, Response
+from typing import Optional
+import json
+import zlib
+from app.soc_store import (
+    get_events,
+    get_events_since,
+    get_counts,
+    get_history,
+    get_timeseries,
+    search_events,
+    last_seq,
+    module_active,
+    STATUS_WINDOW,
+    SOC_PIPELINE,
+    SOC_LOG
+)
+from app.threat import THREATS
 
 router = APIRouter(prefix="/soc", tags=["SOC"])
 
+# ===============================
+# CONDITIONAL GET (ETAG)
+# ===============================
+# A response only changes when a new event arrives, so the newest seq
+# plus the query string identifies it. Anything that changes without a
+# new event (module status, pipeline and threat counters) goes in `extra`.
+
+def make_etag(request: Request, head: int, extra: str = "") -> str:
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return f'W/"{head}-{zlib.crc32((query + extra).encode()):08x}"'
+
+def not_modified(request: Request, etag: str) -> bool:
+    return etag in request.headers.get("if-none-match", "")
+
 
 @router.get("/soc-status")
-def soc_status():
-    events = get_events(200)
+def soc_status(request: Request, response: Response, since: Optional[int] = None):
+    head = last_seq()
+
+    # Status is time-based (last seen within SOC_ACTIVE_SECONDS), so it can
+    # flip to IDLE with no new events
+    active = module_active
+    modules = {
+        "argon2": "ACTIVE" if active("argon2") else "IDLE",
+        "aes": "ACTIVE" if active("aes") else "IDLE",
+        "hmac": "ACTIVE" if active("hmac") else "IDLE",
+        "attack": "MONITORING" if active("attack") else "CLEAR"
+    }
+
+    pipeline = SOC_PIPELINE.stats()
+    threats = THREATS.stats()
 
-    # Detect activity by scanning recent events
-    def active(module: str) -> bool:
-        return any(e["meta"].get("module") == module for e in events)
+    etag = make_etag(
+        request, head,
+        ",".join(modules.values()) + json.dumps([pipeline, threats], sort_keys=True)
+    )
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    # Delta form: only events newer than the client's cursor
+    if since is None:
+        events = get_events(STATUS_WINDOW)
+    else:
+        events, _ = get_events_since(max(since, head - STATUS_WINDOW), STATUS_WINDOW)
+        events.reverse()
 
     return {
         "system": "online",
-        "modules": {
-            "argon2": "ACTIVE" if active("argon2") else "IDLE",
-            "aes": "ACTIVE" if active("aes") else "IDLE",
-            "hmac": "ACTIVE" if active("hmac") else "IDLE",
-            "attack": "MONITORING" if active("attack") else "CLEAR"
-        },
+        "modules": modules,
+        "cursor": head,
+        "event_count": len(events),
+        "counts": get_counts(),
+        "pipeline": pipeline,
+        "threats": threats,
+        "events": events
+    }
+
+
+@router.get("/events")
+def soc_events(
+    request: Request,
+    response: Response,
+    since: int = 0,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    module: Optional[str] = None,
+    level: Optional[str] = None,
+    event_type: Optional[str] = None,
+    attack: Optional[str] = None
+):
+    """Events after a cursor (seq), oldest first. Pass back `cursor`."""
+    head = last_seq()
+    etag = make_etag(request, head)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    after = cursor if cursor is not None else since
+    filters = {
+        field: value
+        for field, value in (
+            ("module", module),
+            ("level", level),
+            ("event_type", event_type),
+            ("attack", attack)
+        )
+        if value is not None
+    }
+
+    events, truncated = get_events_since(after, limit, filters)
+
+    # With filters the last match may be far behind head: resume from
+    # head once every retained event has been looked at. Events stored
+    # after head was read can already be in `events`, so never step back
+    # behind the last one returned
+    if len(events) < limit:
+        next_cursor = max(after, head, events[-1]["seq"] if events else 0)
+    else:
+        next_cursor = events[-1]["seq"]
+
+    return {
+        "cursor": next_cursor,
+        "head": head,
+        "truncated": truncated,
+        "event_count": len(events),
+        "events": events
+    }
+
+
+@router.get("/search")
+def soc_search(
+    q: str = "",
+    module: Optional[str] = None,
+    level: Optional[str] = None,
+    event_type: Optional[str] = None,
+    attack: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """Indexed search: every filter and every word of `q` must match."""
+    filters = {
+        field: value
+        for field, value in (
+            ("module", module),
+            ("level", level),
+            ("event_type", event_type),
+            ("attack", attack)
+        )
+        if value is not None
+    }
+
+    events, scanned = search_events(filters, q, start, end, limit)
+
+    return {
+        "event_count": len(events),
+        "scanned": scanned,
+        "events": events
+    }
+
+
+@router.get("/timeseries")
+def soc_timeseries(
+    resolution: str = Query("1s", pattern="^(1s|1m|1h)$"),
+    window: int = Query(60, ge=1, le=3600),
+    group_by: Optional[str] = Query(None, pattern="^(event_type|module)$"),
+    module: Optional[str] = None,
+    event_type: Optional[str] = None
+):
+    """Event counts per bucket, oldest first, from the rollups (O(buckets)).
+
+    No filter gives the total; `module` / `event_type` one series;
+    `group_by` one series per value seen in the window.
+    """
+    if module is not None:
+        dimension, value = "module", module
+    elif event_type is not None:
+        dimension, value = "event_type", event_type
+    else:
+        dimension, value = group_by, None
+
+    data = get_timeseries(resolution, window, dimension, value)
+
+    return {
+        "resolution": resolution,
+        "buckets": len(data["t"]),
+        **data
+    }
+
+
+@router.get("/history")
+def soc_history(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """Persisted events between two ISO timestamps, oldest first."""
+    events = get_history(start, end, limit)
+
+    return {
+        "persistent": SOC_LOG is not None,
+        "log": SOC_LOG.stats() if SOC_LOG is not None else None,
         "event_count": len(events),
         "events": events
     }
@@ -10,4 +10,6 @@ async def soc_ws(ws: WebSocket):
         while True:
             await ws.receive_text()  # keep alive
     except WebSocketDisconnect:
+        pass
+    finally:
         ws_manager.disconnect(ws)
@@ -3,37 +3,69 @@ import hmac
 import hashlib
 import time
 import uuid
+from contextvars import ContextVar
+from typing import List, Optional
 
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from argon2 import PasswordHasher
+from argon2 import PasswordHasher, extract_parameters
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
 from argon2.low_level import Type
 
+from app.nonce_store import create_nonce_store
+from app.calibrate import DEFAULT_PARAMS, calibrate, load_params, save_params
+from app.config import ARGON2_CALIBRATE
+from app.config import AES_KEY, HMAC_SECRET  # noqa: F401 (re-exported)
+from app.keyring import aes_keys, hmac_keys
+from app.metrics import CRYPTO_SECONDS, CRYPTO_FAILURES
+
 # ===============================
 # GLOBALS
 # ===============================
 
-USED_NONCES = set()
+HMAC_WINDOW_SECONDS = 30
+
+USED_NONCES = create_nonce_store(window=HMAC_WINDOW_SECONDS)
+
+# Set by app.attack_campaign.isolated_state()
+NONCE_OVERRIDE = ContextVar("nonce_store", default=None)
+
 
-AES_KEY = os.getenv("AES_KEY")
-AES_KEY = AES_KEY.encode() if AES_KEY else os.urandom(32)
+def current_nonces():
+    nonces = NONCE_OVERRIDE.get()
+    return USED_NONCES if nonces is None else nonces
 
-HMAC_SECRET = os.getenv("HMAC_SECRET", "demo-secret")
+# Host-calibrated parameters if present (python -m app.calibrate --save)
+ARGON2_PARAMS = load_params()
+if ARGON2_PARAMS is None and ARGON2_CALIBRATE:
+    ARGON2_PARAMS = calibrate()
+    save_params(ARGON2_PARAMS)
+
+_params = ARGON2_PARAMS or DEFAULT_PARAMS
 
 ph = PasswordHasher(
-    memory_cost=65536,
-    time_cost=3,
-    parallelism=4,
+    memory_cost=_params["memory_cost"],
+    time_cost=_params["time_cost"],
+    parallelism=_params["parallelism"],
     hash_len=32,
     salt_len=16,
     type=Type.ID
 )
 
+ARGON2_CALIBRATION = {
+    "source": "calibrated" if ARGON2_PARAMS else "default",
+    **({
+        "target_p95_ms": ARGON2_PARAMS.get("target_p95_ms"),
+        "measured_p95_ms": ARGON2_PARAMS.get("measured_p95_ms"),
+        "concurrency": ARGON2_PARAMS.get("concurrency")
+    } if ARGON2_PARAMS else {})
+}
+
 # ===============================
 # ARGON2 (DEMO)
 # ===============================
 
 def hash_password_with_steps(password: str):
-    hashed = ph.hash(password)
+    with CRYPTO_SECONDS.time(("argon2_hash",)):
+        hashed = ph.hash(password)
     salt = hashed.split("$")[4]
 
     return {
@@ -44,37 +76,75 @@ def hash_password_with_steps(password: str):
             "params": {
                 "memory": ph.memory_cost,
                 "iterations": ph.time_cost,
-                "parallelism": ph.parallelism
+                "parallelism": ph.parallelism,
+                **ARGON2_CALIBRATION
             },
             "hash": hashed
         }
     }
 
+
+def verify_password(password: str, hashed: str, rehash: bool = False):
+    try:
+        with CRYPTO_SECONDS.time(("argon2_verify",)):
+            ph.verify(hashed, password)
+        valid = True
+    except VerifyMismatchError:
+        CRYPTO_FAILURES.inc(("argon2_verify",))
+        valid = False
+    except (InvalidHashError, VerificationError):
+        CRYPTO_FAILURES.inc(("argon2_verify",))
+        raise ValueError("Invalid Argon2 hash")
+
+    needs_rehash = needs_upgrade(hashed)
+
+    result = {
+        "algorithm": "Argon2id",
+        "valid": valid,
+        "needs_rehash": needs_rehash
+    }
+
+    # Only a verified password may be used to produce the upgraded hash
+    if rehash and valid and needs_rehash:
+        with CRYPTO_SECONDS.time(("argon2_hash",)):
+            result["new_hash"] = ph.hash(password)
+
+    return result
+
+def needs_upgrade(hashed: str) -> bool:
+    """Stored hash is weaker than ph. Unlike ph.check_needs_rehash(), a
+    stronger stored hash (e.g. after calibrating down) is left alone."""
+    stored = extract_parameters(hashed)
+    return (
+        stored.type is not Type.ID
+        or stored.memory_cost < ph.memory_cost
+        or stored.time_cost < ph.time_cost
+        or stored.hash_len < ph.hash_len
+    )
+
 # ===============================
 # AES (DEMO)
 # ===============================
 
 def encrypt_and_verify_aes(data: str):
-    aes = AESGCM(AES_KEY)
-    nonce = os.urandom(12)
-    ciphertext = aes.encrypt(nonce, data.encode(), None)
+    key_id, nonce, ciphertext = encrypt_bytes(data.encode())
 
     return {
         "algorithm": "AES-256-GCM",
         "status": "Encrypted",
-        "key": AES_KEY.hex(),          # ✅ ADDED (demo only)
+        "key": aes_keys.key(key_id).hex(),          # ✅ ADDED (demo only)
+        "key_id": key_id,
         "nonce": nonce.hex(),
         "ciphertext": ciphertext.hex()
     }
 
 
-def decrypt_and_verify_aes(ciphertext: str, nonce: str):
-    aes = AESGCM(AES_KEY)
+def decrypt_and_verify_aes(ciphertext: str, nonce: str, key_id: Optional[str] = None):
     try:
-        plaintext = aes.decrypt(
+        plaintext = decrypt_bytes(
             bytes.fromhex(nonce),
             bytes.fromhex(ciphertext),
-            None
+            key_id
         ).decode()
 
         return {
@@ -85,6 +155,29 @@ def decrypt_and_verify_aes(ciphertext: str, nonce: str):
     except Exception:
         raise ValueError("Integrity verification failed")
 
+# ===============================
+# AES (RAW BYTES / BULK)
+# ===============================
+
+def encrypt_bytes(data: bytes, tenant: Optional[str] = None):
+    """Encrypt under the active key. Returns (key_id, nonce, ciphertext)."""
+    key_id, cipher = aes_keys.aes(tenant=tenant)
+    nonce = os.urandom(12)
+    with CRYPTO_SECONDS.time(("aes_encrypt",)):
+        ciphertext = cipher.encrypt(nonce, data, None)
+    return key_id, nonce, ciphertext
+
+
+def decrypt_bytes(nonce: bytes, ciphertext: bytes, key_id: Optional[str] = None,
+                  tenant: Optional[str] = None) -> bytes:
+    try:
+        _, cipher = aes_keys.aes(key_id, tenant)
+        with CRYPTO_SECONDS.time(("aes_decrypt",)):
+            return cipher.decrypt(nonce, ciphertext, None)
+    except Exception:
+        CRYPTO_FAILURES.inc(("aes_decrypt",))
+        raise ValueError("Integrity verification failed")
+
 # ===============================
 # HMAC GENERATION (FRONTEND DEMO SUPPORT)
 # ===============================
@@ -118,27 +211,116 @@ def verify_hmac_request(
     resource: str,
     nonce: str,
     timestamp: str,
-    signature: str
+    signature: str,
+    key_id: Optional[str] = None,
+    tenant: Optional[str] = None
 ):
-    # 1️⃣ Replay protection (nonce reuse)
-    if nonce in USED_NONCES:
+    keyed = hmac_state(key_id, tenant)
+    check_hmac_request(keyed, int(time.time()), action, user_id, resource, nonce, timestamp, signature)
+
+
+def verify_hmac_batch(entries: List[dict], key_id: Optional[str] = None,
+                      tenant: Optional[str] = None) -> List[Optional[str]]:
+    """Verify many signed requests. Returns None or the rejection reason per entry."""
+    keyed = hmac_state(key_id, tenant)
+    now = int(time.time())
+    results = []
+
+    for entry in entries:
+        try:
+            check_hmac_request(
+                keyed, now,
+                entry["action"],
+                entry["user_id"],
+                entry["resource"],
+                entry["nonce"],
+                entry["timestamp"],
+                entry["signature"]
+            )
+            results.append(None)
+        except ValueError as e:
+            results.append(str(e))
+
+    return results
+
+
+def hmac_state(key_id: Optional[str] = None, tenant: Optional[str] = None):
+    """Pre-keyed HMAC state from the key ring (copy before use)."""
+    try:
+        return hmac_keys.hmac(key_id, tenant)[1]
+    except ValueError:
+        raise ValueError("HMAC signature mismatch (unknown key id)")
+
+
+def check_hmac_request(keyed, now: int, action, user_id, resource, nonce, timestamp, signature,
+                       nonces=None):
+    with CRYPTO_SECONDS.time(("hmac_verify",)):
+        # 1️⃣ + 2️⃣ Replay protection and timestamp freshness
+        ts = check_nonce_and_timestamp(nonce, timestamp, now, nonces)
+
+        # 3️⃣ Recompute HMAC on backend (pre-keyed state from the key ring)
+        message = f"{action}|{user_id}|{resource}|{nonce}|{timestamp}"
+        mac = keyed.copy()
+        mac.update(message.encode())
+
+        # 4️⃣ + 5️⃣ Integrity check, then burn the nonce
+        check_signature(mac, signature, nonce, ts, now, nonces)
+
+
+def check_nonce_and_timestamp(nonce: str, timestamp: str, now: int, nonces=None) -> int:
+    # `nonces` replaces the current store (simulations keep their own)
+    nonces = current_nonces() if nonces is None else nonces
+
+    # Replay protection (nonce reuse)
+    if nonce in nonces:
+        CRYPTO_FAILURES.inc(("hmac_verify",))
         raise ValueError("Replay attack detected (nonce reused)")
 
-    # 2️⃣ Timestamp freshness (30 seconds window)
-    if abs(int(time.time()) - int(timestamp)) > 30:
+    # Timestamp freshness (30 seconds window)
+    try:
+        ts = int(timestamp)
+    except ValueError:
+        CRYPTO_FAILURES.inc(("hmac_verify",))
+        raise ValueError("Stale request detected (invalid timestamp)")
+    if abs(now - ts) > HMAC_WINDOW_SECONDS:
+        CRYPTO_FAILURES.inc(("hmac_verify",))
         raise ValueError("Stale request detected")
 
-    # 3️⃣ Recompute HMAC on backend
-    message = f"{action}|{user_id}|{resource}|{nonce}|{timestamp}"
-    expected_signature = hmac.new(
-        HMAC_SECRET.encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
+    return ts
 
-    # 4️⃣ Payload integrity check
-    if not hmac.compare_digest(expected_signature, signature):
+
+def check_signature(mac, signature: str, nonce: str, ts: int, now: int, nonces=None) -> None:
+    nonces = current_nonces() if nonces is None else nonces
+
+    # Payload integrity check
+    if not hmac.compare_digest(mac.hexdigest(), signature):
+        CRYPTO_FAILURES.inc(("hmac_verify",))
         raise ValueError("HMAC signature mismatch (payload tampered)")
 
-    # 5️⃣ Mark nonce as used ONLY after full verification
-    USED_NONCES.add(nonce)
+    # Mark nonce as used ONLY after full verification
+    if not nonces.add(nonce, ts, now):
+        CRYPTO_FAILURES.inc(("hmac_verify",))
+        raise ValueError("Replay attack detected (nonce reused)")
+
+# ===============================
+# SIGNED REQUEST BODIES
+# ===============================
+# Signature = HMAC(key, "METHOD|path?query|nonce|timestamp|" + body). The
+# headers are checked up front and the body is fed in as it arrives, so
+# a signed upload is verified in one pass with constant memory.
+
+def begin_signed_request(method: str, target: str, nonce: str, timestamp: str,
+                         key_id: Optional[str] = None, tenant: Optional[str] = None,
+                         now: Optional[int] = None):
+    """Check nonce, timestamp and key id. Returns (mac, ts) to feed the body into."""
+    now = int(time.time()) if now is None else now
+    ts = check_nonce_and_timestamp(nonce, timestamp, now)
+
+    mac = hmac_state(key_id, tenant).copy()
+    mac.update(f"{method}|{target}|{nonce}|{timestamp}|".encode())
+    return mac, ts
+
+
+def finish_signed_request(mac, signature: str, nonce: str, ts: int,
+                          now: Optional[int] = None) -> None:
+    check_signature(mac, signature, nonce, ts, int(time.time()) if now is None else now)
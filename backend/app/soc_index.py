@@ -0,0 +1,122 @@
+import bisect
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+# Fields with a posting list per value
+INDEXED_FIELDS = ("event_type", "module", "level", "attack")
+
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+# ===============================
+# POSTING LIST
+# ===============================
+# Ascending seqs. Events leave the store oldest first, so eviction only
+# ever removes the head: advance an offset and compact now and then.
+
+class PostingList:
+    __slots__ = ("seqs", "head")
+
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.head = 0
+
+    def append(self, seq: int) -> None:
+        self.seqs.append(seq)
+
+    def pop_head(self, seq: int) -> None:
+        if self.head < len(self.seqs) and self.seqs[self.head] == seq:
+            self.head += 1
+            if self.head > 1024 and self.head * 2 > len(self.seqs):
+                del self.seqs[:self.head]
+                self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.seqs) - self.head
+
+    def __contains__(self, seq: int) -> bool:
+        i = bisect.bisect_left(self.seqs, seq, self.head)
+        return i < len(self.seqs) and self.seqs[i] == seq
+
+
+def bisect_key(seqs, lo: int, hi: int, value, key: Callable[[int], object]) -> int:
+    """First position in seqs[lo:hi] whose key(seq) >= value."""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key(seqs[mid]) < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def tokenize(text: str) -> Set[str]:
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+def field_value(event: Dict, field: str):
+    if field == "event_type":
+        return event["event_type"]
+    return event["meta"].get(field)
+
+# ===============================
+# EVENT INDEX
+# ===============================
+
+class EventIndex:
+    def __init__(self):
+        self.fields: Dict[str, Dict[str, PostingList]] = {f: {} for f in INDEXED_FIELDS}
+        self.tokens: Dict[str, PostingList] = {}
+
+    def _keys(self, event: Dict):
+        for field in INDEXED_FIELDS:
+            value = field_value(event, field)
+            if value is not None:
+                yield self.fields[field], str(value)
+        for token in tokenize(event["message"]):
+            yield self.tokens, token
+
+    def add(self, event: Dict) -> None:
+        seq = event["seq"]
+        for table, key in self._keys(event):
+            postings = table.get(key)
+            if postings is None:
+                postings = table[key] = PostingList()
+            postings.append(seq)
+
+    def remove(self, event: Dict) -> None:
+        seq = event["seq"]
+        for table, key in self._keys(event):
+            postings = table.get(key)
+            if postings is None:
+                continue
+            postings.pop_head(seq)
+            if not postings:
+                del table[key]
+
+    def postings(self, filters: Dict[str, str], terms: Iterable[str]) -> Optional[List[PostingList]]:
+        """Posting lists to intersect, or None if any term has no match."""
+        lists = []
+        for field, value in filters.items():
+            postings = self.fields.get(field, {}).get(str(value))
+            if postings is None:
+                return None
+            lists.append(postings)
+        for term in terms:
+            postings = self.tokens.get(term)
+            if postings is None:
+                return None
+            lists.append(postings)
+        return lists
+
+    def clear(self) -> None:
+        for table in self.fields.values():
+            table.clear()
+        self.tokens.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "fields": {f: len(t) for f, t in self.fields.items()},
+            "tokens": len(self.tokens),
+            "postings": sum(len(p) for t in self.fields.values() for p in t.values())
+            + sum(len(p) for p in self.tokens.values())
+        }
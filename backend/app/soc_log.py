@@ -0,0 +1,354 @@
+import bisect
+import glob
+import heapq
+import json
+import mmap
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import (
+    SOC_SEGMENT_MB,
+    SOC_SEGMENT_SECONDS,
+    SOC_RETENTION_DAYS,
+    SOC_LOG_FSYNC
+)
+
+# Sparse index granularity: one (timestamp, offset) entry per N events
+INDEX_EVERY = 256
+
+# ===============================
+# SEGMENT
+# ===============================
+# seg-<created ms>-<writer>.jsonl holds one event per line in arrival
+# order, and seg-<created ms>-<writer>.idx the sparse index as
+# "<timestamp> <offset>" lines. Event timestamps are fixed-width ISO
+# strings, so they compare as text.
+#
+# Every process (uvicorn / gunicorn worker) appends to its own stream of
+# segments, named after its pid, and never touches another one's files
+# except to expire them. Readers merge all streams by timestamp.
+
+def _log_ts(event: Dict) -> str:
+    return event["timestamp"]
+
+
+def _writer_alive(writer: str) -> bool:
+    """Is the process behind a segment stream still running on this host?"""
+    if writer == str(os.getpid()):
+        return True
+    try:
+        os.kill(int(writer), 0)
+    except (ValueError, OverflowError, ProcessLookupError):
+        return False   # single-writer layout, or the worker is gone
+    except PermissionError:
+        return True    # alive, owned by someone else
+    return True
+
+
+class Segment:
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path[:-len(".jsonl")] + ".idx"
+        # seg-<ms>.jsonl (single writer layout) belongs to stream ""
+        name = os.path.basename(path)[len("seg-"):-len(".jsonl")]
+        self.writer = name.partition("-")[2]
+        self.index: List[Tuple[str, int]] = []
+        self.last_ts: Optional[str] = None
+        self.size = 0
+
+    @property
+    def first_ts(self) -> Optional[str]:
+        return self.index[0][0] if self.index else None
+
+    def load(self) -> None:
+        self.size = os.path.getsize(self.path)
+        self.index = []
+        try:
+            with open(self.index_path) as f:
+                for line in f:
+                    ts, _, offset = line.rstrip("\n").partition(" ")
+                    if offset:
+                        self.index.append((ts, int(offset)))
+        except OSError:
+            pass
+
+        last = None
+        for event in self.iter_reverse():
+            last = event
+            break
+        self.last_ts = last["timestamp"] if last else None
+
+    def _map(self) -> Optional[mmap.mmap]:
+        if self.size == 0:
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None   # expired by another worker, or still empty
+
+    def iter_from(self, offset: int) -> Iterator[Dict]:
+        """Events from byte offset onwards, read through mmap."""
+        mm = self._map()
+        if mm is None:
+            return
+        try:
+            pos, end = offset, len(mm)
+            while pos < end:
+                nl = mm.find(b"\n", pos)
+                if nl < 0:
+                    break   # torn last line (crash, or a write in progress)
+                yield json.loads(mm[pos:nl])
+                pos = nl + 1
+        finally:
+            mm.close()
+
+    def iter_reverse(self) -> Iterator[Dict]:
+        # Starts at the last newline, so a torn last line is skipped
+        mm = self._map()
+        if mm is None:
+            return
+        try:
+            end = mm.rfind(b"\n")
+            while end > 0:
+                start = mm.rfind(b"\n", 0, end) + 1
+                yield json.loads(mm[start:end])
+                end = start - 1
+        finally:
+            mm.close()
+
+    def seek(self, start_ts: Optional[str]) -> int:
+        """Byte offset of the last index entry before start_ts."""
+        if not start_ts or not self.index:
+            return 0
+        i = bisect.bisect_left(self.index, (start_ts, -1)) - 1
+        return self.index[i][1] if i >= 0 else 0
+
+# ===============================
+# EVENT LOG
+# ===============================
+
+class EventLog:
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = SOC_SEGMENT_MB * 1024 * 1024,
+        segment_seconds: int = SOC_SEGMENT_SECONDS,
+        retention_days: float = SOC_RETENTION_DAYS,
+        fsync: bool = SOC_LOG_FSYNC
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.retention_days = retention_days
+        self.fsync = fsync
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._index_file = None
+        self._current: Optional[Segment] = None
+        self._pid = 0
+        self._opened_at = 0.0
+        self._since_index = 0
+
+        self.written = 0
+        self.commits = 0
+        self.deleted_segments = 0
+
+        # Sorted by path, so each stream's segments are in creation order.
+        # A crash can leave a torn last line; the file is never appended to
+        # again and readers stop before it, so nothing needs repairing.
+        self.segments: List[Segment] = []
+        self._refresh()
+        self.apply_retention()
+
+    # -------------------------------
+    # WRITE
+    # -------------------------------
+
+    def append(self, events: List[Dict]) -> None:
+        """Group commit: one write (and optional fsync) per batch."""
+        if not events:
+            return
+
+        with self._lock:
+            self._maybe_rotate()
+            segment = self._current
+
+            lines = []
+            offset = segment.size
+            for event in events:
+                line = json.dumps(event, separators=(",", ":")) + "\n"
+                if self._since_index == 0:
+                    segment.index.append((event["timestamp"], offset))
+                    self._index_file.write(f"{event['timestamp']} {offset}\n")
+                self._since_index = (self._since_index + 1) % INDEX_EVERY
+                offset += len(line.encode())
+                lines.append(line)
+
+            self._file.write("".join(lines))
+            self._file.flush()
+            self._index_file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+            segment.size = offset
+            segment.last_ts = events[-1]["timestamp"]
+            self.written += len(events)
+            self.commits += 1
+
+    def _maybe_rotate(self) -> None:
+        now = time.time()
+        pid = os.getpid()
+
+        if (
+            self._file is not None
+            and self._pid == pid
+            and self._current.size < self.segment_bytes
+            and now - self._opened_at < self.segment_seconds
+        ):
+            return
+
+        if self._file is not None:
+            # After a fork the handles belong to the parent's stream
+            self._file.close()
+            self._index_file.close()
+
+        path = os.path.join(self.directory, f"seg-{int(now * 1000):013d}-{pid}.jsonl")
+        segment = Segment(path)
+
+        self._file = open(path, "a", encoding="utf-8")
+        self._index_file = open(segment.index_path, "a", encoding="utf-8")
+        self._current = segment
+        self._pid = pid
+        self._opened_at = now
+        self._since_index = 0
+
+        self.segments.append(segment)
+        self.segments.sort(key=lambda s: s.path)
+        self.apply_retention()
+
+    def apply_retention(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        cutoff = cutoff.isoformat(timespec="microseconds") + "Z"
+
+        # Never delete a segment that may still be appended to: our own,
+        # or the newest one of another worker that is still running.
+        # Streams of workers that are gone expire like any other.
+        newest = {}
+        for segment in self.segments:
+            newest[segment.writer] = segment
+
+        keep = []
+        for segment in self.segments:
+            if (
+                segment is self._current
+                or (segment is newest[segment.writer] and _writer_alive(segment.writer))
+                or (segment.last_ts is not None and segment.last_ts >= cutoff)
+            ):
+                keep.append(segment)
+                continue
+            for path in (segment.path, segment.index_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.deleted_segments += 1
+        self.segments = keep
+
+    # -------------------------------
+    # READ
+    # -------------------------------
+
+    def _refresh(self) -> None:
+        """Pick up segments other workers created, grew or expired."""
+        known = {s.path: s for s in self.segments}
+        segments = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "seg-*.jsonl"))):
+            segment = known.get(path)
+            if segment is self._current and segment is not None:
+                segments.append(segment)
+                continue
+            try:
+                if segment is None:
+                    segment = Segment(path)
+                    segment.load()
+                elif os.path.getsize(path) != segment.size:
+                    segment.load()
+            except OSError:
+                continue   # expired meanwhile
+            segments.append(segment)
+        self.segments = segments
+
+    def _streams(self) -> List[List[Segment]]:
+        streams: Dict[str, List[Segment]] = {}
+        for segment in self.segments:
+            streams.setdefault(segment.writer, []).append(segment)
+        return list(streams.values())
+
+    def tail(self, limit: int) -> List[Dict]:
+        """Newest `limit` events of all workers, oldest first."""
+        with self._lock:
+            self._refresh()
+            streams = self._streams()
+
+        def newest_first(segments: List[Segment]) -> Iterator[Dict]:
+            for segment in reversed(segments):
+                yield from segment.iter_reverse()
+
+        merged = heapq.merge(*(newest_first(s) for s in streams), key=_log_ts, reverse=True)
+        out = [event for _, event in zip(range(limit), merged)]
+        return out[::-1]
+
+    def query(self, start: Optional[str] = None, end: Optional[str] = None,
+              limit: int = 100) -> List[Dict]:
+        """Events with start <= timestamp <= end of all workers, oldest first."""
+        with self._lock:
+            self._refresh()
+            streams = self._streams()
+
+        merged = heapq.merge(*(self._range(s, start, end) for s in streams), key=_log_ts)
+        return [event for _, event in zip(range(limit), merged)]
+
+    @staticmethod
+    def _range(segments: Iterable[Segment], start: Optional[str],
+               end: Optional[str]) -> Iterator[Dict]:
+        for segment in segments:
+            # Skip segments entirely outside the range
+            if end and segment.first_ts and segment.first_ts > end:
+                return
+            if start and segment.last_ts and segment.last_ts < start:
+                continue
+
+            for event in segment.iter_from(segment.seek(start)):
+                ts = event["timestamp"]
+                if start and ts < start:
+                    continue
+                if end and ts > end:
+                    return
+                yield event
+
+    def stats(self) -> Dict:
+        return {
+            "directory": self.directory,
+            "writer": str(self._pid or os.getpid()),
+            "writers": len(self._streams()),
+            "segments": len(self.segments),
+            "bytes": sum(s.size for s in self.segments),
+            "written": self.written,
+            "commits": self.commits,
+            "deleted_segments": self.deleted_segments,
+            "retention_days": self.retention_days
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._index_file.close()
+                self._file = None
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.config import SOC_ACTIVE_SECONDS
+
+# resolution name -> (bucket seconds, buckets kept)
+RESOLUTIONS = {
+    "1s": (1, 3600),      # last hour
+    "1m": (60, 1440),     # last day
+    "1h": (3600, 720)     # last 30 days
+}
+
+DIMENSIONS = ("event_type", "module")
+
+Key = Tuple[str, str]
+TOTAL: Key = ("total", "*")
+
+# ===============================
+# TIME-BUCKETED SERIES
+# ===============================
+# A fixed ring of buckets per resolution. A slot is reused once its time
+# has passed out of the window, so memory is O(buckets), not O(events).
+# Slots only move forward in time; events older than their slot are
+# dropped.
+
+class RollupSeries:
+    def __init__(self, bucket_seconds: int, buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self._starts = [-1] * buckets
+        self._counts: List[Counter] = [Counter() for _ in range(buckets)]
+
+    def add(self, ts: float, keys: List[Key]) -> None:
+        bucket = int(ts // self.bucket_seconds)
+        slot = bucket % self.buckets
+        start = self._starts[slot]
+        if bucket < start:
+            # Late event whose bucket has already left the window: dropping
+            # it keeps the newer bucket in this slot intact
+            return
+        if bucket > start:
+            self._starts[slot] = bucket
+            self._counts[slot] = Counter()
+
+        counts = self._counts[slot]
+        for key in keys:
+            counts[key] += 1
+
+    def window(self, now: float, count: int) -> List[Tuple[int, Counter]]:
+        """(bucket start epoch, counts) for the newest `count` buckets, oldest first."""
+        count = min(count, self.buckets)
+        last = int(now // self.bucket_seconds)
+        out = []
+        for bucket in range(last - count + 1, last + 1):
+            slot = bucket % self.buckets
+            counts = self._counts[slot] if self._starts[slot] == bucket else Counter()
+            out.append((bucket * self.bucket_seconds, counts))
+        return out
+
+# ===============================
+# ROLLUP ENGINE
+# ===============================
+
+class RollupEngine:
+    def __init__(self, active_seconds: int = SOC_ACTIVE_SECONDS):
+        self.active_seconds = active_seconds
+        self.series = {name: RollupSeries(*spec) for name, spec in RESOLUTIONS.items()}
+        self.last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def event_time(event: Dict) -> float:
+        stamp = datetime.fromisoformat(event["timestamp"].rstrip("Z"))
+        return stamp.replace(tzinfo=timezone.utc).timestamp()
+
+    def add_many(self, events: List[Dict]) -> None:
+        with self._lock:
+            for event in events:
+                ts = self.event_time(event)
+                keys = [TOTAL, ("event_type", event["event_type"])]
+
+                module = event["meta"].get("module")
+                if module is not None:
+                    keys.append(("module", module))
+                    if ts > self.last_seen.get(module, 0):
+                        self.last_seen[module] = ts
+
+                for series in self.series.values():
+                    series.add(ts, keys)
+
+    def module_active(self, module: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - self.last_seen.get(module, 0) <= self.active_seconds
+
+    def timeseries(self, resolution: str, window: int, dimension: Optional[str] = None,
+                   value: Optional[str] = None, now: Optional[float] = None) -> Dict:
+        """One series for (dimension, value), every value of `dimension`, or the total."""
+        if resolution not in self.series:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        if dimension is not None and dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+
+        series = self.series[resolution]
+        now = time.time() if now is None else now
+
+        with self._lock:
+            buckets = [(start, Counter(counts)) for start, counts in series.window(now, window)]
+
+        times = [start for start, _ in buckets]
+
+        if dimension is None:
+            return {"t": times, "series": {"total": [c[TOTAL] for _, c in buckets]}}
+
+        if value is not None:
+            key = (dimension, value)
+            return {"t": times, "series": {value: [c[key] for _, c in buckets]}}
+
+        values = sorted({k[1] for _, c in buckets for k in c if k[0] == dimension})
+        return {
+            "t": times,
+            "series": {v: [c[(dimension, v)] for _, c in buckets] for v in values}
+        }
@@ -1,25 +1,429 @@
-from datetime import datetime
-from typing import Dict, List, Optional
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
 
-SOC_EVENTS: List[Dict] = []
-MAX_EVENTS = 1000
+from app.config import SOC_MAX_EVENTS, SOC_QUEUE_SIZE, SOC_BATCH_MAX, SOC_LOG_DIR
+from app.soc_log import EventLog
+from app.soc_index import EventIndex, bisect_key, tokenize
+from app.soc_rollup import RollupEngine
+from app.ws_manager import ws_manager
 
-def log_event(event_type: str, message: str, meta: Optional[Dict] = None) -> Dict:
-    event = {
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+MAX_EVENTS = SOC_MAX_EVENTS
+
+# Events returned by /soc/soc-status
+STATUS_WINDOW = 200
+
+# ===============================
+# COUNTERS
+# ===============================
+
+class EventCounters:
+    def __init__(self):
+        self.module = Counter()
+        self.level = Counter()
+        self.event_type = Counter()
+
+    def add(self, event: Dict) -> None:
+        meta = event["meta"]
+        self.module[meta.get("module")] += 1
+        self.level[meta.get("level")] += 1
+        self.event_type[event["event_type"]] += 1
+
+    def remove(self, event: Dict) -> None:
+        meta = event["meta"]
+        self._dec(self.module, meta.get("module"))
+        self._dec(self.level, meta.get("level"))
+        self._dec(self.event_type, event["event_type"])
+
+    @staticmethod
+    def _dec(counter: Counter, key) -> None:
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def clear(self) -> None:
+        self.module.clear()
+        self.level.clear()
+        self.event_type.clear()
+
+    def as_dict(self) -> Dict:
+        # None means the event had no such meta field
+        return {
+            "module": {k: v for k, v in self.module.items() if k is not None},
+            "level": {k: v for k, v in self.level.items() if k is not None},
+            "event_type": dict(self.event_type)
+        }
+
+# ===============================
+# RING BUFFER STORE
+# ===============================
+
+class EventStore:
+    def __init__(self, capacity: int = MAX_EVENTS):
+        self.capacity = capacity
+
+        self._buf: List[Optional[Dict]] = [None] * capacity
+        self._total = 0
+        self._lock = threading.Lock()
+
+        # Sequence numbers are contiguous, so seq -> slot is arithmetic
+        self.last_seq = 0
+        self._last_ts = ""
+
+        # Posting lists per field value and per message token
+        self.index = EventIndex()
+
+        # Everything retained
+        self.counts = EventCounters()
+
+    def append(self, event: Dict) -> None:
+        with self._lock:
+            self._append(event)
+
+    def extend(self, events: List[Dict]) -> None:
+        # One lock round-trip per pipeline batch
+        with self._lock:
+            for event in events:
+                self._append(event)
+
+    def _append(self, event: Dict) -> None:
+        # Restored events keep their seq when the store starts from them
+        seq = event.get("seq")
+        if not (isinstance(seq, int) and len(self) == 0 and seq > self.last_seq):
+            seq = self.last_seq + 1
+        event["seq"] = seq
+        self.last_seq = seq
+
+        # Timestamps never go backwards in seq order (log_event() can race
+        # the pipeline thread), so search() can bisect time ranges
+        if event["timestamp"] < self._last_ts:
+            event["timestamp"] = self._last_ts
+        self._last_ts = event["timestamp"]
+
+        pos = self._total % self.capacity
+
+        evicted = self._buf[pos]
+        if evicted is not None:
+            self.counts.remove(evicted)
+            self.index.remove(evicted)
+
+        self._buf[pos] = event
+        self._total += 1
+
+        self.counts.add(event)
+        self.index.add(event)
+
+    def latest(self, limit: int = 100) -> List[Dict]:
+        """Newest first."""
+        with self._lock:
+            n = min(max(limit, 0), len(self))
+            end = self._total
+            return [self._buf[(end - 1 - i) % self.capacity] for i in range(n)]
+
+    def _get(self, seq: int) -> Dict:
+        size = len(self)
+        return self._buf[(self._total - size + (seq - (self.last_seq - size + 1))) % self.capacity]
+
+    def since(self, seq: int, limit: int = 100, filters: Optional[Dict] = None) -> Tuple[List[Dict], bool]:
+        """Events with seq > `seq`, oldest first.
+
+        The flag is True when events after `seq` were already evicted.
+        """
+        events, _ = self.search(filters or {}, after=seq, limit=limit, newest_first=False)
+        with self._lock:
+            truncated = seq + 1 < self.last_seq - len(self) + 1
+        return events, truncated
+
+    def search(
+        self,
+        filters: Dict,
+        terms: Iterable[str] = (),
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        after: int = 0,
+        limit: int = 100,
+        newest_first: bool = True
+    ) -> Tuple[List[Dict], int]:
+        """Events matching every filter and message term within a time range.
+
+        Walks the shortest posting list and checks the others by bisect,
+        narrowing it to the time range by binary search first (seq order
+        is arrival order). Returns the events and how many were examined.
+        """
+        with self._lock:
+            size = len(self)
+            if size == 0:
+                return [], 0
+
+            lists = self.index.postings(filters, terms) if (filters or terms) else []
+            if lists is None:
+                return [], 0
+
+            if lists:
+                driver = min(lists, key=len)
+                others = [p for p in lists if p is not driver]
+                seqs, lo, hi = driver.seqs, driver.head, len(driver.seqs)
+            else:
+                others = []
+                seqs = range(self.last_seq - size + 1, self.last_seq + 1)
+                lo, hi = 0, size
+
+            def ts(seq):
+                return self._get(seq)["timestamp"]
+
+            lo = bisect_key(seqs, lo, hi, after + 1, lambda s: s)
+            if start:
+                lo = bisect_key(seqs, lo, hi, start, ts)
+            if end:
+                hi = bisect_key(seqs, lo, hi, end + "\uffff", ts)
+
+            order = range(hi - 1, lo - 1, -1) if newest_first else range(lo, hi)
+            out, scanned = [], 0
+            for i in order:
+                seq = seqs[i]
+                scanned += 1
+                if all(seq in p for p in others):
+                    out.append(self._get(seq))
+                    if len(out) >= limit:
+                        break
+
+            return out, scanned
+
+    def __len__(self) -> int:
+        return min(self._total, self.capacity)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buf = [None] * self.capacity
+            self._total = 0
+            self._last_ts = ""
+            self.counts.clear()
+            self.index.clear()
+
+
+SOC_EVENTS = EventStore()
+
+# ===============================
+# EVENT PIPELINE
+# ===============================
+# emit_event() is what request handlers call: it only appends a tuple to a
+# queue. A background thread turns queued items into events in batches,
+# stores them and hands each batch to every sink (e.g. the WebSocket
+# fan-out), so SOC work never adds to request latency.
+
+Sink = Callable[[List[Dict]], None]
+
+
+class EventPipeline:
+    def __init__(self, store: EventStore, queue_size: int = SOC_QUEUE_SIZE,
+                 batch_max: int = SOC_BATCH_MAX):
+        self.store = store
+        self.queue_size = queue_size
+        self.batch_max = batch_max
+
+        self._pending: Deque[Tuple] = deque()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._sinks: List[Sink] = []
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Guards the counters and ties "queue empty" to the idle flag
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        self.emitted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.batches = 0
+        self.sink_errors = 0
+
+    def add_sink(self, sink: Sink) -> None:
+        self._sinks.append(sink)
+
+    def emit(self, event_type: str, message: str, meta: Optional[Dict] = None) -> bool:
+        """Cheap, non-blocking enqueue. False if the event was dropped."""
+        if self._thread is None:
+            self._start()
+
+        with self._lock:
+            if len(self._pending) >= self.queue_size:
+                self.dropped += 1
+                return False
+
+            self._pending.append((time.time(), event_type, message, meta))
+            self.emitted += 1
+            self._idle.clear()
+
+        self._wakeup.set()
+        return True
+
+    def publish(self, events: List[Dict]) -> None:
+        """Store and fan out already-built events on the caller's thread."""
+        self.store.extend(events)
+        for sink in self._sinks:
+            try:
+                sink(events)
+            except Exception:
+                with self._lock:
+                    self.sink_errors += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything emitted so far has been processed."""
+        return self._idle.wait(timeout)
+
+    def stop(self) -> None:
+        """Let the worker thread exit once the queue is drained."""
+        self._stopped = True
+        self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="soc-pipeline", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_max:
+                    batch.append(make_event(*self._pending.popleft()))
+
+                self.publish(batch)
+                with self._lock:
+                    self.processed += len(batch)
+                    self.batches += 1
+
+            # Under the lock, so an emit() in between cannot be marked idle
+            with self._lock:
+                if not self._pending:
+                    self._idle.set()
+
+            if self._stopped:
+                return
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queued": len(self._pending),
+                "emitted": self.emitted,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "batches": self.batches,
+                "sink_errors": self.sink_errors
+            }
+
+
+def make_event(ts: float, event_type: str, message: str, meta: Optional[Dict] = None) -> Dict:
+    # Fixed width (always microseconds) so timestamps sort as text
+    stamp = datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+    return {
+        "timestamp": stamp.isoformat(timespec="microseconds") + "Z",
         "event_type": event_type,
         "message": message,
         "meta": meta or {}
     }
 
-    SOC_EVENTS.append(event)
-    if len(SOC_EVENTS) > MAX_EVENTS:
-        SOC_EVENTS.pop(0)
 
+def ws_sink(events: List[Dict]) -> None:
+    # Live push to /ws/soc (non-blocking, per-client queues)
+    ws_manager.publish_many([
+        {
+            **event,
+            "module": event["meta"].get("module"),
+            "level": event["meta"].get("level")
+        }
+        for event in events
+    ])
+
+
+SOC_PIPELINE = EventPipeline(SOC_EVENTS)
+
+# Set by app.attack_campaign.isolated_state()
+PIPELINE_OVERRIDE: ContextVar[Optional[EventPipeline]] = ContextVar("soc_pipeline", default=None)
+
+
+def current_pipeline() -> EventPipeline:
+    pipeline = PIPELINE_OVERRIDE.get()
+    return SOC_PIPELINE if pipeline is None else pipeline
+
+# ===============================
+# ROLLUPS
+# ===============================
+# 1s/1m/1h counters per event_type and module, fed from every batch. They
+# outlive the ring buffer and drive charts and module status.
+
+SOC_ROLLUPS = RollupEngine()
+
+# ===============================
+# PERSISTENCE
+# ===============================
+# History survives restarts: the newest MAX_EVENTS are restored into the
+# ring buffer, older events stay on disk for /soc/history.
+
+SOC_LOG: Optional[EventLog] = EventLog(SOC_LOG_DIR) if SOC_LOG_DIR else None
+
+if SOC_LOG is not None:
+    SOC_EVENTS.extend(SOC_LOG.tail(MAX_EVENTS))
+    SOC_ROLLUPS.add_many(SOC_EVENTS.latest(MAX_EVENTS)[::-1])
+    SOC_PIPELINE.add_sink(SOC_LOG.append)
+
+SOC_PIPELINE.add_sink(SOC_ROLLUPS.add_many)
+
+SOC_PIPELINE.add_sink(ws_sink)
+
+# ===============================
+# API
+# ===============================
+
+def emit_event(event_type: str, message: str, meta: Optional[Dict] = None) -> bool:
+    """Queue an event from a request handler (never blocks)."""
+    return current_pipeline().emit(event_type, message, meta)
+
+def log_event(event_type: str, message: str, meta: Optional[Dict] = None) -> Dict:
+    """Record an event synchronously and return it."""
+    event = make_event(time.time(), event_type, message, meta)
+    current_pipeline().publish([event])
     return event
 
 def get_events(limit: int = 100) -> List[Dict]:
-    return SOC_EVENTS[-limit:][::-1]
+    return SOC_EVENTS.latest(limit)
+
+def module_active(module: str, now: Optional[float] = None) -> bool:
+    """True if the module logged within the last SOC_ACTIVE_SECONDS."""
+    return SOC_ROLLUPS.module_active(module, now)
+
+def get_timeseries(resolution: str = "1s", window: int = 60,
+                   dimension: Optional[str] = None, value: Optional[str] = None) -> Dict:
+    return SOC_ROLLUPS.timeseries(resolution, window, dimension, value)
+
+def get_counts() -> Dict:
+    return SOC_EVENTS.counts.as_dict()
+
+def get_events_since(seq: int, limit: int = 100, filters: Optional[Dict] = None):
+    return SOC_EVENTS.since(seq, limit, filters)
+
+def search_events(filters: Dict, text: str = "", start: Optional[str] = None,
+                  end: Optional[str] = None, limit: int = 100):
+    return SOC_EVENTS.search(filters, tokenize(text), start, end, limit=limit)
+
+def last_seq() -> int:
+    return SOC_EVENTS.last_seq
+
+def get_history(start: Optional[str] = None, end: Optional[str] = None,
+                limit: int = 100) -> List[Dict]:
+    if SOC_LOG is None:
+        return []
+    return SOC_LOG.query(start, end, limit)
 
 def clear_events() -> None:
     SOC_EVENTS.clear()
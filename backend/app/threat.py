@@ -0,0 +1,251 @@
+import math
+import threading
+import time
+from contextvars import ContextVar
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+
+from app.config import (
+    THREAT_WINDOW_SECONDS,
+    THREAT_MAX_FAILURES,
+    THREAT_BLOCK_SECONDS,
+    THREAT_RATE,
+    THREAT_BURST,
+    THREAT_REPORT_SECONDS,
+    THREAT_MAX_CLIENTS
+)
+from app.soc_store import emit_event
+
+# ("ip", "1.2.3.4") or ("user", "alice")
+ClientKey = Tuple[str, str]
+
+# ===============================
+# THREAT SCORING
+# ===============================
+# Runs before any HMAC / GCM work. Per client it keeps a token bucket and
+# a sliding-window failure count (current + weighted previous window), so
+# every check is O(1) in time and memory. Too many failures block the
+# client; blocked requests are answered 429 and only counted, then
+# reported as one ATTACK_BLOCKED event per THREAT_REPORT_SECONDS.
+
+class ThreatBlockedError(Exception):
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class ClientState:
+    __slots__ = ("tokens", "refilled", "window_start", "current", "previous", "blocked_until")
+
+    def __init__(self, now: float, burst: float):
+        self.tokens = burst
+        self.refilled = now
+        self.window_start = now
+        self.current = 0
+        self.previous = 0
+        self.blocked_until = 0.0
+
+
+class ThreatEngine:
+    def __init__(
+        self,
+        window: int = THREAT_WINDOW_SECONDS,
+        max_failures: int = THREAT_MAX_FAILURES,
+        block_seconds: int = THREAT_BLOCK_SECONDS,
+        rate: float = THREAT_RATE,
+        burst: float = THREAT_BURST,
+        report_seconds: int = THREAT_REPORT_SECONDS,
+        max_clients: int = THREAT_MAX_CLIENTS
+    ):
+        self.window = window
+        self.max_failures = max_failures
+        self.block_seconds = block_seconds
+        self.rate = rate
+        self.burst = burst
+        self.report_seconds = report_seconds
+        self.max_clients = max_clients
+
+        self._clients: "OrderedDict[ClientKey, ClientState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Rejections not yet reported, per client and per reason
+        self._pending_clients: Counter = Counter()
+        self._pending_reasons: Counter = Counter()
+        self._next_report = time.time() + report_seconds
+
+        self.checked = 0
+        self.rate_limited = 0
+        self.rejected_blocked = 0
+        self.failures = 0
+        self.blocks = 0
+
+    def _state(self, key: ClientKey, now: float) -> ClientState:
+        state = self._clients.get(key)
+        if state is None:
+            state = self._clients[key] = ClientState(now, self.burst)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(key)
+        return state
+
+    def _roll(self, state: ClientState, now: float) -> None:
+        elapsed = now - state.window_start
+        if elapsed >= self.window:
+            # A whole empty window in between means nothing carries over
+            state.previous = state.current if elapsed < 2 * self.window else 0
+            state.current = 0
+            state.window_start += (elapsed // self.window) * self.window
+
+    def _score(self, state: ClientState, now: float) -> float:
+        """Failures in the last `window` seconds (sliding-window estimate)."""
+        self._roll(state, now)
+        overlap = 1 - (now - state.window_start) / self.window
+        return state.current + state.previous * overlap
+
+    # -------------------------------
+    # CHECK (before crypto)
+    # -------------------------------
+
+    def check(self, keys: Iterable[ClientKey], cost: float = 1.0,
+              now: Optional[float] = None) -> None:
+        """Raise ThreatBlockedError if any client is blocked or over its rate.
+
+        cost=0 only checks for a block (e.g. per user inside a batch).
+        """
+        now = time.time() if now is None else now
+        error = None
+
+        with self._lock:
+            self.checked += 1
+            for key in keys:
+                state = self._state(key, now)
+
+                if state.blocked_until > now:
+                    self.rejected_blocked += 1
+                    error = ThreatBlockedError(
+                        math.ceil(state.blocked_until - now),
+                        "Client blocked after repeated failures"
+                    )
+                else:
+                    state.tokens = min(self.burst, state.tokens + (now - state.refilled) * self.rate)
+                    state.refilled = now
+                    if state.tokens < cost:
+                        self.rate_limited += 1
+                        error = ThreatBlockedError(
+                            max(1, math.ceil((cost - state.tokens) / self.rate)),
+                            "Rate limit exceeded"
+                        )
+                    else:
+                        state.tokens -= cost
+
+                if error is not None:
+                    self._pending_clients[f"{key[0]}:{key[1]}"] += 1
+                    self._pending_reasons[str(error)] += 1
+                    break
+
+        self._maybe_report(now)
+        if error is not None:
+            raise error
+
+    # -------------------------------
+    # RECORD OUTCOME (after crypto)
+    # -------------------------------
+
+    def fail(self, keys: Iterable[ClientKey], count: int = 1,
+             now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        blocked = []
+
+        with self._lock:
+            for key in keys:
+                state = self._state(key, now)
+                score = self._score(state, now)
+                state.current += count
+                self.failures += count
+
+                if state.blocked_until <= now and score + count >= self.max_failures:
+                    state.blocked_until = now + self.block_seconds
+                    self.blocks += 1
+                    blocked.append((key, math.ceil(score + count)))
+
+        for (kind, value), failures in blocked:
+            emit_event(
+                event_type="ATTACK_BLOCKED",
+                message=f"Blocked {kind} {value} for {self.block_seconds}s after "
+                        f"{failures} failures in {self.window}s",
+                meta={
+                    "module": "attack",
+                    "level": "danger",
+                    "client": f"{kind}:{value}",
+                    "failures": failures
+                }
+            )
+
+    def _maybe_report(self, now: float) -> None:
+        with self._lock:
+            if now < self._next_report:
+                return
+            self._next_report = now + self.report_seconds
+            if not self._pending_clients:
+                return
+            clients, self._pending_clients = self._pending_clients, Counter()
+            reasons, self._pending_reasons = self._pending_reasons, Counter()
+
+        total = sum(clients.values())
+        emit_event(
+            event_type="ATTACK_BLOCKED",
+            message=f"Rejected {total} requests from {len(clients)} clients before verification",
+            meta={
+                "module": "attack",
+                "level": "danger",
+                "count": total,
+                "reasons": dict(reasons),
+                "clients": dict(clients.most_common(20))
+            }
+        )
+
+    def blocked(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            return sum(1 for s in self._clients.values() if s.blocked_until > now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            self._pending_clients.clear()
+            self._pending_reasons.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "clients": len(self._clients),
+            "blocked": self.blocked(),
+            "checked": self.checked,
+            "rate_limited": self.rate_limited,
+            "rejected_blocked": self.rejected_blocked,
+            "failures": self.failures,
+            "blocks": self.blocks
+        }
+
+
+THREATS = ThreatEngine()
+
+# Set by app.attack_campaign.isolated_state()
+THREATS_OVERRIDE: ContextVar[Optional[ThreatEngine]] = ContextVar("threats", default=None)
+
+
+def current_threats() -> ThreatEngine:
+    engine = THREATS_OVERRIDE.get()
+    return THREATS if engine is None else engine
+
+# ===============================
+# REQUEST HELPERS
+# ===============================
+
+def client_keys(request: Request, user_id: Optional[str] = None) -> Tuple[ClientKey, ...]:
+    ip = request.client.host if request.client else "unknown"
+    if user_id is None:
+        return (("ip", ip),)
+    return (("ip", ip), ("user", user_id))
@@ -1,19 +1,133 @@
-from typing import List
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
 from fastapi import WebSocket
 
+from app.config import WS_QUEUE_SIZE, WS_BATCH_MAX, WS_BATCH_WINDOW_MS, WS_SEND_TIMEOUT
+from app.metrics import WS_SEND_SECONDS
+
+# ===============================
+# PER-CLIENT QUEUE
+# ===============================
+# Each dashboard gets its own bounded queue and sender task, so a slow or
+# dead client only ever delays (and drops) its own events.
+
+class WSClient:
+    def __init__(self, ws: WebSocket, queue_size: int):
+        self.ws = ws
+        self.queue: Deque[dict] = deque(maxlen=queue_size)
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.sent = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def push(self, data: dict) -> None:
+        # deque(maxlen) silently discards the oldest entry
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(data)
+        self.wakeup.set()
+
+
 class WSManager:
     def __init__(self):
-        self.connections: List[WebSocket] = []
+        self.clients: Dict[WebSocket, WSClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+        self.published = 0
+        self.disconnected = 0
+
+    @property
+    def connections(self) -> List[WebSocket]:
+        return list(self.clients)
 
     async def connect(self, ws: WebSocket):
         await ws.accept()
-        self.connections.append(ws)
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+        client = WSClient(ws, WS_QUEUE_SIZE)
+        client.task = asyncio.create_task(self._sender(client))
+        self.clients[ws] = client
 
     def disconnect(self, ws: WebSocket):
-        self.connections.remove(ws)
+        client = self.clients.pop(ws, None)
+        if client is None:
+            return
+
+        self.disconnected += 1
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def publish(self, data: dict) -> None:
+        """Queue an event for every client. Safe to call from any thread."""
+        self.publish_many([data])
+
+    def publish_many(self, items: List[dict]) -> None:
+        if not self.clients or self._loop is None:
+            return
+
+        self.published += len(items)
+        if threading.get_ident() == self._loop_thread:
+            self._fanout(items)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._fanout, items)
+            except RuntimeError:
+                # Event loop already closed (shutdown)
+                pass
 
     async def broadcast(self, data: dict):
-        for ws in self.connections:
-            await ws.send_json(data)
+        self.publish(data)
+
+    def _fanout(self, items: List[dict]) -> None:
+        for client in self.clients.values():
+            for data in items:
+                client.push(data)
+
+    async def _sender(self, client: WSClient):
+        window = WS_BATCH_WINDOW_MS / 1000
+
+        while True:
+            await client.wakeup.wait()
+            client.wakeup.clear()
+
+            # Let a burst build up so it goes out as one frame
+            if window > 0:
+                await asyncio.sleep(window)
+
+            batch = []
+            while client.queue and len(batch) < WS_BATCH_MAX:
+                batch.append(client.queue.popleft())
+            if client.queue:
+                client.wakeup.set()
+            if not batch:
+                # Woken during the window for events already sent
+                continue
+
+            try:
+                with WS_SEND_SECONDS.time():
+                    await asyncio.wait_for(client.ws.send_json(batch), WS_SEND_TIMEOUT)
+                client.sent += len(batch)
+            except Exception:
+                # Dead or stuck client: forget it, never touch the others
+                self.disconnect(client.ws)
+                try:
+                    await client.ws.close()
+                except Exception:
+                    pass
+                return
+
+    def stats(self) -> Dict:
+        return {
+            "clients": len(self.clients),
+            "published": self.published,
+            "disconnected": self.disconnected,
+            "queued": sum(len(c.queue) for c in self.clients.values()),
+            "dropped": sum(c.dropped for c in self.clients.values())
+        }
 
 ws_manager = WSManager()
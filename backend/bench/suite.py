@@ -0,0 +1,486 @@
+"""
+Latency and throughput for every crypto path, endpoint and the WebSocket fan-out.
+
+Endpoints are driven in process through httpx's ASGI transport, the
+crypto paths by calling app.security directly. Each scenario reports
+throughput, p50/p95/p99 latency, errors and memory; results go out as
+JSON and can be compared against an earlier run.
+
+    python -m bench.suite --concurrency 16 --requests 500 --out bench.json
+    python -m bench.suite --only aes,hmac --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from app import security
+from app.attack_campaign import isolated_state, percentiles
+from app.soc_store import log_event
+from app.threat import ThreatEngine
+from app.ws_manager import WSManager
+
+# Scenario groups for --only
+GROUPS = ("argon2", "aes", "hmac", "soc", "ws")
+
+# ===============================
+# MEMORY
+# ===============================
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def max_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 1024), 1)
+
+# ===============================
+# INPUTS
+# ===============================
+
+SECRET = security.hmac_state()
+
+
+def sign(message: bytes) -> str:
+    mac = SECRET.copy()
+    mac.update(message)
+    return mac.hexdigest()
+
+
+def hmac_params() -> Dict:
+    nonce = uuid.uuid4().hex[:12]
+    timestamp = str(int(time.time()))
+    return {
+        "action": "READ",
+        "user_id": "bench",
+        "resource": "report",
+        "nonce": nonce,
+        "timestamp": timestamp,
+        "signature": sign(f"READ|bench|report|{nonce}|{timestamp}".encode())
+    }
+
+
+def signed_upload(body: bytes) -> Dict:
+    nonce = uuid.uuid4().hex
+    timestamp = str(int(time.time()))
+    return {
+        "method": "POST",
+        "url": "/hmac/signed/upload",
+        "content": body,
+        "headers": {
+            "x-signature": sign(f"POST|/hmac/signed/upload|{nonce}|{timestamp}|".encode() + body),
+            "x-nonce": nonce,
+            "x-timestamp": timestamp
+        }
+    }
+
+
+PAYLOAD_1K = os.urandom(1024)
+PAYLOAD_1M = os.urandom(1024 * 1024)
+SEALED = security.encrypt_and_verify_aes("benchmark record")
+
+# ===============================
+# SCENARIOS
+# ===============================
+# direct: fn() is timed on a thread pool of `concurrency` threads
+# http:   request() gives httpx kwargs, sent by `concurrency` tasks
+
+def direct_scenarios() -> Dict[str, Dict]:
+    def aes_roundtrip():
+        key_id, nonce, ct = security.encrypt_bytes(PAYLOAD_1K)
+        security.decrypt_bytes(nonce, ct, key_id)
+
+    def hmac_verify():
+        p = hmac_params()
+        security.verify_hmac_request(
+            p["action"], p["user_id"], p["resource"], p["nonce"], p["timestamp"], p["signature"]
+        )
+
+    def hmac_batch_100():
+        security.verify_hmac_batch([hmac_params() for _ in range(100)])
+
+    return {
+        "direct.argon2_hash": {"group": "argon2", "fn": lambda: security.ph.hash("bench-password")},
+        "direct.aes_roundtrip_1k": {"group": "aes", "fn": aes_roundtrip},
+        "direct.hmac_verify": {"group": "hmac", "fn": hmac_verify},
+        "direct.hmac_batch_100": {"group": "hmac", "fn": hmac_batch_100}
+    }
+
+
+def http_scenarios() -> Dict[str, Dict]:
+    def hmac_batch():
+        body = json.dumps([{**hmac_params(), "id": str(i)} for i in range(100)])
+        return {"method": "POST", "url": "/hmac/batch", "content": body,
+                "headers": {"content-type": "application/json"}}
+
+    return {
+        "http.argon2": {
+            "group": "argon2",
+            "request": lambda: {"method": "GET", "url": "/argon2", "params": {"password": "bench"}}
+        },
+        "http.aes_demo": {
+            "group": "aes",
+            "request": lambda: {"method": "POST", "url": "/aes-demo", "params": {"data": "bench"}}
+        },
+        "http.aes_decrypt": {
+            "group": "aes",
+            "request": lambda: {
+                "method": "POST", "url": "/aes-decrypt",
+                "params": {k: SEALED[k] for k in ("ciphertext", "nonce", "key_id")}
+            }
+        },
+        "http.aes_encrypt_raw_1k": {
+            "group": "aes",
+            "request": lambda: {
+                "method": "POST", "url": "/aes/encrypt", "content": PAYLOAD_1K,
+                "headers": {"content-type": "application/octet-stream"}
+            }
+        },
+        "http.aes_stream_encrypt_1m": {
+            "group": "aes",
+            "request": lambda: {
+                "method": "POST", "url": "/aes/stream/encrypt", "content": PAYLOAD_1M,
+                "headers": {"content-type": "application/octet-stream"}
+            }
+        },
+        "http.hmac_demo": {
+            "group": "hmac",
+            "request": lambda: {"method": "POST", "url": "/hmac-demo", "params": hmac_params()}
+        },
+        "http.hmac_batch_100": {"group": "hmac", "request": hmac_batch},
+        "http.hmac_signed_upload_1m": {"group": "hmac", "request": lambda: signed_upload(PAYLOAD_1M)},
+        "http.soc_status": {
+            "group": "soc",
+            "request": lambda: {"method": "GET", "url": "/soc/soc-status"}
+        },
+        "http.soc_events": {
+            "group": "soc",
+            "request": lambda: {"method": "GET", "url": "/soc/events", "params": {"limit": 100}}
+        },
+        "http.soc_search": {
+            "group": "soc",
+            "request": lambda: {"method": "GET", "url": "/soc/search",
+                                "params": {"q": "verified", "module": "aes"}}
+        },
+        "http.soc_timeseries": {
+            "group": "soc",
+            "request": lambda: {"method": "GET", "url": "/soc/timeseries",
+                                "params": {"resolution": "1s", "window": 300, "group_by": "module"}}
+        }
+    }
+
+# ===============================
+# RUNNERS
+# ===============================
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float,
+              rss_before: float, peak_alloc: Optional[int]) -> Dict:
+    count = len(latencies)
+    return {
+        "name": name,
+        "requests": count,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        **percentiles(latencies),
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1),
+        **({"peak_alloc_mb": round(peak_alloc / 2 ** 20, 2)} if peak_alloc is not None else {})
+    }
+
+
+def run_direct(name: str, fn: Callable, requests: int, concurrency: int) -> Dict:
+    def timed():
+        began = time.perf_counter()
+        try:
+            fn()
+            return time.perf_counter() - began, False
+        except Exception:
+            return time.perf_counter() - began, True
+
+    rss_before = rss_mb()
+    began = time.perf_counter()
+    # Pool threads do not inherit context: carry the isolated state over
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: context.copy().run(timed), range(requests)))
+    elapsed = time.perf_counter() - began
+
+    return summarize(name, [r[0] for r in results], sum(r[1] for r in results),
+                     elapsed, rss_before, traced_peak())
+
+
+async def run_http(client: httpx.AsyncClient, name: str, request: Callable,
+                   requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            kwargs = request()
+            began = time.perf_counter()
+            try:
+                response = await client.request(**kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - began)
+
+    rss_before = rss_mb()
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+
+    return summarize(name, latencies, errors, elapsed, rss_before, traced_peak())
+
+
+class FakeSocket:
+    """Stands in for a dashboard WebSocket: records when each event lands."""
+
+    def __init__(self, delay: float, received: List[float]):
+        self.delay = delay
+        self.received = received
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, batch):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        now = time.perf_counter()
+        for event in batch:
+            self.received.append(now - event["sent"])
+
+    async def close(self):
+        pass
+
+
+async def run_ws(clients: int, events: int, rate: float, slow_clients: int,
+                 slow_delay: float) -> Dict:
+    """publish() -> send on every client, through a private WSManager."""
+    manager = WSManager()
+    received: List[float] = []
+    slow: List[float] = []
+
+    fast = [FakeSocket(0.0, received) for _ in range(clients)]
+    sockets = fast + [FakeSocket(slow_delay, slow) for _ in range(slow_clients)]
+    for ws in sockets:
+        await manager.connect(ws)
+
+    def fast_dropped() -> int:
+        return sum(manager.clients[ws].dropped for ws in fast if ws in manager.clients)
+
+    # Publish in 10 ms ticks to hold `rate` events/s
+    tick = 0.01
+    per_tick = max(1, int(rate * tick))
+
+    rss_before = rss_mb()
+    began = time.perf_counter()
+    for i in range(events):
+        manager.publish({"seq": i, "sent": time.perf_counter()})
+        if (i + 1) % per_tick == 0:
+            await asyncio.sleep(tick)
+
+    expected = clients * events
+    deadline = time.perf_counter() + 30
+    while len(received) + fast_dropped() < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - began
+
+    dropped = fast_dropped()
+    stats = manager.stats()
+    for ws in sockets:
+        manager.disconnect(ws)
+
+    result = summarize("ws.fanout", received, expected - len(received) - dropped, elapsed,
+                       rss_before, traced_peak())
+    result.update({
+        "clients": clients,
+        "events": events,
+        "publish_rate": rate,
+        "deliveries_per_s": result.pop("throughput_rps"),
+        "dropped": dropped,
+        # Slow clients may only drop their own events, never delay the rest
+        "slow_clients": slow_clients,
+        "slow_client_p99_ms": percentiles(slow)["p99_ms"],
+        "slow_client_dropped": stats["dropped"] - dropped
+    })
+    return result
+
+
+def traced_peak() -> Optional[int]:
+    if not tracemalloc.is_tracing():
+        return None
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    return peak
+
+# ===============================
+# BASELINE COMPARISON
+# ===============================
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[Dict]:
+    """Per scenario: throughput and p95 change vs the baseline (percent)."""
+    before = {r["name"]: r for r in baseline.get("results", [])}
+    rows = []
+    for r in results:
+        old = before.get(r["name"])
+        if old is None:
+            continue
+
+        rate_key = "deliveries_per_s" if "deliveries_per_s" in r else "throughput_rps"
+        rate = pct(r[rate_key], old.get(rate_key))
+        p95 = pct(r["p95_ms"], old.get("p95_ms"))
+
+        rows.append({
+            "name": r["name"],
+            "throughput_change_pct": rate,
+            "p95_change_pct": p95,
+            "regression": (rate is not None and rate < -threshold)
+            or (p95 is not None and p95 > threshold)
+        })
+    return rows
+
+
+def pct(new: float, old: Optional[float]) -> Optional[float]:
+    if not old:
+        return None
+    return round((new - old) / old * 100, 1)
+
+# ===============================
+# MAIN
+# ===============================
+
+async def run_suite(args) -> List[Dict]:
+    from app.main import app
+
+    groups = set(args.only.split(",")) if args.only else set(GROUPS)
+    results = []
+
+    def counts(group: str) -> int:
+        return args.argon2_requests if group == "argon2" else args.requests
+
+    # Benchmark traffic comes from one client: no rate limits, private
+    # nonces and SOC pipeline
+    with isolated_state(threats=ThreatEngine(rate=1e9, burst=1e9, max_failures=10 ** 9)):
+        # Something for the SOC endpoints to read
+        for i in range(args.soc_events):
+            log_event("AES_DECRYPT_SUCCESS", f"AES-256-GCM decryption verified #{i}",
+                      {"module": "aes", "level": "success"})
+
+        for name, spec in direct_scenarios().items():
+            if spec["group"] in groups:
+                results.append(run_direct(name, spec["fn"], counts(spec["group"]), args.concurrency))
+                print(json.dumps(results[-1]), file=sys.stderr)
+
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120
+        ) as client:
+            for name, spec in http_scenarios().items():
+                if spec["group"] in groups:
+                    results.append(await run_http(
+                        client, name, spec["request"], counts(spec["group"]), args.concurrency
+                    ))
+                    print(json.dumps(results[-1]), file=sys.stderr)
+
+        if "ws" in groups:
+            results.append(await run_ws(
+                args.ws_clients, args.ws_events, args.ws_rate,
+                args.ws_slow_clients, args.ws_slow_delay
+            ))
+            print(json.dumps(results[-1]), file=sys.stderr)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=300, help="per scenario")
+    parser.add_argument("--argon2-requests", type=int, default=16,
+                        help="per Argon2 scenario (each hash holds ~64 MiB)")
+    parser.add_argument("--only", default="", help=f"comma-separated groups: {','.join(GROUPS)}")
+    parser.add_argument("--soc-events", type=int, default=1000,
+                        help="events preloaded for the SOC endpoints")
+    parser.add_argument("--ws-clients", type=int, default=50)
+    parser.add_argument("--ws-slow-clients", type=int, default=2)
+    parser.add_argument("--ws-slow-delay", type=float, default=0.05,
+                        help="seconds each send takes on a slow client")
+    parser.add_argument("--ws-events", type=int, default=2000)
+    parser.add_argument("--ws-rate", type=float, default=500, help="events published per second")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also report peak Python allocations (slower)")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent change that counts as a regression")
+    args = parser.parse_args()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    results = asyncio.run(run_suite(args))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        # Parameters actually in use, plus where they came from
+        "argon2": {
+            "memory_cost": security.ph.memory_cost,
+            "time_cost": security.ph.time_cost,
+            "parallelism": security.ph.parallelism,
+            **security.ARGON2_CALIBRATION
+        },
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "argon2_requests": args.argon2_requests
+        },
+        "max_rss_mb": max_rss_mb(),
+        "results": results
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(results, json.load(f), args.threshold)
+        regressions = [r["name"] for r in report["comparison"] if r["regression"]]
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    # Non-zero exit so CI can fail on a slowdown
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+
+# Before any app module is imported: no SOC log on disk, in-memory nonces
+os.environ["SOC_LOG_DIR"] = ""
+os.environ["NONCE_BACKEND"] = "memory"
+
+import pytest
+
+from app.attack_campaign import isolated_state
+
+
+@pytest.fixture
+def state():
+    """Private nonce store, threat engine and SOC pipeline for one test."""
+    with isolated_state() as state:
+        yield state
+
+
+@pytest.fixture
+def asgi():
+    """call(app, method, url, **kwargs) -> httpx.Response, in process.
+
+    Runs in a copy of the test's context, so `state` applies to it.
+    """
+    import asyncio
+
+    import httpx
+
+    def call(app, method: str, url: str, client=("127.0.0.1", 123), **kwargs):
+        async def go():
+            transport = httpx.ASGITransport(app=app, client=client)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+                return await c.request(method, url, **kwargs)
+        return asyncio.run(go())
+
+    return call
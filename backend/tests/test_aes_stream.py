@@ -0,0 +1,82 @@
+import os
+
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.aes_stream import TAG_LEN, StreamDecryptor, StreamEncryptor
+
+CHUNK = 16
+KEY = AESGCM(os.urandom(32))
+
+
+def seal(data: bytes, key: AESGCM = KEY):
+    """(header, sealed chunks)"""
+    encryptor = StreamEncryptor(key, "k1", chunk_size=CHUNK)
+    body = encryptor.update(data) + encryptor.finalize()
+    size = CHUNK + TAG_LEN
+    return encryptor.header, [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def unseal(sealed: bytes, key: AESGCM = KEY, part: int = 7) -> bytes:
+    decryptor = StreamDecryptor(lambda key_id: key)
+    out = bytearray()
+    for i in range(0, len(sealed), part):
+        out += decryptor.update(sealed[i:i + part])
+    return bytes(out + decryptor.finalize())
+
+
+@pytest.mark.parametrize("length", [0, 1, CHUNK, CHUNK + 1, 5 * CHUNK, 5 * CHUNK + 3])
+def test_roundtrip(length):
+    data = os.urandom(length)
+    header, chunks = seal(data)
+    assert unseal(header + b"".join(chunks)) == data
+
+
+def test_truncated_at_chunk_boundary_rejected():
+    header, chunks = seal(os.urandom(5 * CHUNK + 3))
+    # Drop the last chunk: the one now at the end lacks the last-chunk flag
+    with pytest.raises(ValueError):
+        unseal(header + b"".join(chunks[:-1]))
+
+
+def test_truncated_mid_chunk_rejected():
+    header, chunks = seal(os.urandom(5 * CHUNK + 3))
+    with pytest.raises(ValueError):
+        unseal(header + b"".join(chunks)[:-5])
+
+
+def test_reordered_chunks_rejected():
+    header, chunks = seal(os.urandom(5 * CHUNK + 3))
+    chunks[0], chunks[1] = chunks[1], chunks[0]
+    with pytest.raises(ValueError):
+        unseal(header + b"".join(chunks))
+
+
+def test_wrong_key_rejected():
+    header, chunks = seal(b"secret" * 10)
+    with pytest.raises(ValueError):
+        unseal(header + b"".join(chunks), key=AESGCM(os.urandom(32)))
+
+
+def test_oversized_chunk_size_rejected():
+    encryptor = StreamEncryptor(KEY, "k1", chunk_size=64 * 1024 * 1024)
+    with pytest.raises(ValueError):
+        StreamDecryptor(lambda key_id: KEY).update(encryptor.header)
+
+
+def test_stream_routes_roundtrip(state, asgi):
+    from app.main import app
+
+    data = os.urandom(300 * 1024)
+    sealed = asgi(app, "POST", "/aes/stream/encrypt", content=data)
+    assert sealed.status_code == 200
+    assert int(sealed.headers["content-length"]) == len(sealed.content)
+
+    plain = asgi(app, "POST", "/aes/stream/decrypt", content=sealed.content)
+    assert plain.status_code == 200
+    assert plain.content == data
+
+    # Nothing is sent before the whole stream verified: a clean 400
+    tampered = bytearray(sealed.content)
+    tampered[len(tampered) // 2] ^= 1
+    assert asgi(app, "POST", "/aes/stream/decrypt", content=bytes(tampered)).status_code == 400
@@ -0,0 +1,57 @@
+import base64
+
+from app.aes_stream import StreamEncryptor
+from app.keyring import aes_keys
+from app.main import app
+from app.security import encrypt_bytes, encrypt_and_verify_aes
+
+IP = (("ip", "127.0.0.1"),)
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def tampered_record() -> dict:
+    key_id, nonce, ciphertext = encrypt_bytes(b"record")
+    return {"key_id": key_id, "nonce": b64(nonce), "ciphertext": b64(ciphertext[:-1] + b"\0")}
+
+
+def test_blocked_ip_gets_429_on_every_decrypt_route(state, asgi):
+    threats = state["threats"]
+    threats.fail(IP, threats.max_failures)
+
+    enc = encrypt_and_verify_aes("secret")
+    record = tampered_record()
+    calls = [
+        ("/aes-decrypt", {"params": {k: enc[k] for k in ("ciphertext", "nonce", "key_id")}}),
+        ("/aes/decrypt", {"json": record}),
+        ("/aes/batch", {"json": {"op": "decrypt", "records": [record] * 1000}}),
+        ("/aes/stream/decrypt", {"content": b"CGS1" + b"\0" * 64}),
+    ]
+    for url, kwargs in calls:
+        r = asgi(app, "POST", url, **kwargs)
+        assert r.status_code == 429, url
+        assert "Retry-After" in r.headers
+
+    # Nothing reached GCM
+    assert threats.failures == threats.max_failures
+
+
+def test_failed_tags_are_recorded(state, asgi):
+    threats = state["threats"]
+
+    assert asgi(app, "POST", "/aes/decrypt", json=tampered_record()).status_code == 400
+    assert threats.failures == 1
+
+    r = asgi(app, "POST", "/aes/batch", json={"op": "decrypt", "records": [tampered_record()] * 3})
+    assert r.json()["failed"] == 3
+    assert threats.failures == 4
+
+    key_id, cipher = aes_keys.aes()
+    encryptor = StreamEncryptor(cipher, key_id, chunk_size=16)
+    sealed = bytearray(encryptor.header + encryptor.update(b"x" * 40) + encryptor.finalize())
+    sealed[-1] ^= 1
+    r = asgi(app, "POST", "/aes/stream/decrypt", content=bytes(sealed))
+    assert r.status_code == 400
+    assert threats.failures == 5
@@ -0,0 +1,42 @@
+import json
+
+from argon2 import PasswordHasher
+
+from app import security
+from app.calibrate import MIN_PARAMS, calibrate, load_params
+
+
+def hasher(memory_cost: int, time_cost: int) -> PasswordHasher:
+    return PasswordHasher(memory_cost=memory_cost, time_cost=time_cost, parallelism=1)
+
+
+def test_missed_target_keeps_the_floor():
+    params = calibrate(target_ms=0.001, concurrency=1, rounds=1)
+    assert not params["target_met"]
+    assert params["memory_cost"] == MIN_PARAMS["memory_cost"]
+    assert params["time_cost"] == MIN_PARAMS["time_cost"]
+
+
+def test_weak_saved_params_are_raised_to_the_floor(tmp_path):
+    path = tmp_path / "params.json"
+    path.write_text(json.dumps({"memory_cost": 8192, "time_cost": 1, "parallelism": 1}))
+
+    params = load_params(str(path))
+    assert params["memory_cost"] == MIN_PARAMS["memory_cost"]
+    assert params["time_cost"] == MIN_PARAMS["time_cost"]
+
+
+def test_weaker_hash_needs_rehash():
+    weak = hasher(MIN_PARAMS["memory_cost"], 1).hash("pw")
+    result = security.verify_password("pw", weak, rehash=True)
+    assert result["valid"] and result["needs_rehash"]
+    assert not security.needs_upgrade(result["new_hash"])
+
+
+def test_stronger_hash_is_never_downgraded():
+    ph = security.ph
+    strong = hasher(ph.memory_cost * 2, ph.time_cost + 1).hash("pw")
+    result = security.verify_password("pw", strong, rehash=True)
+    assert result["valid"]
+    assert not result["needs_rehash"]
+    assert "new_hash" not in result
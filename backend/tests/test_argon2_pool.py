@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.argon2_pool import Argon2Pool, PoolBusyError
+from app.main import app
+from app.routes import argon2 as argon2_routes
+
+
+def test_admission_rejects_past_queue_depth():
+    pool = Argon2Pool(workers=1, queue_depth=1)
+    gate = threading.Event()
+
+    async def go():
+        first = pool.submit(gate.wait)
+        second = pool.submit(lambda: "queued")
+        with pytest.raises(PoolBusyError) as busy:
+            pool.submit(lambda: "rejected")
+        assert busy.value.retry_after >= 1
+
+        gate.set()
+        assert await second == "queued"
+        await first
+        await asyncio.sleep(0)          # slot release runs on the loop
+
+        assert await pool.submit(lambda: "admitted") == "admitted"
+
+    asyncio.run(go())
+    stats = pool.stats()
+    assert (stats["completed"], stats["rejected"], stats["inflight"]) == (3, 1, 0)
+    pool.shutdown()
+
+
+def test_batches_wait_and_leave_room_for_singles():
+    pool = Argon2Pool(workers=2, queue_depth=2)
+    gate = threading.Event()
+    assert pool.batch_slots == 2
+
+    async def go():
+        batch = [await pool.submit_when_ready(gate.wait) for _ in range(2)]
+        waiting = asyncio.ensure_future(pool.submit_when_ready(lambda: "late"))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        # A single request is still admitted while batches wait
+        single = pool.submit(lambda: "single")
+        assert pool.stats()["inflight"] == 3
+
+        gate.set()
+        await asyncio.gather(*batch)
+        assert await single == "single"
+        assert await (await waiting) == "late"
+
+    asyncio.run(go())
+    pool.shutdown()
+
+
+def test_saturated_pool_returns_503_with_retry_after(monkeypatch, state, asgi):
+    pool = Argon2Pool(workers=1, queue_depth=0)
+    monkeypatch.setattr(argon2_routes, "argon2_pool", pool)
+    gate = threading.Event()
+
+    async def saturate():
+        return pool.submit(gate.wait)
+
+    # Fill the only slot from a loop that stays alive in another thread
+    loop = asyncio.new_event_loop()
+    runner = threading.Thread(target=loop.run_forever, daemon=True)
+    runner.start()
+    asyncio.run_coroutine_threadsafe(saturate(), loop).result()
+
+    try:
+        response = asgi(app, "GET", "/argon2", params={"password": "pw"})
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 1
+    finally:
+        gate.set()
+        loop.call_soon_threadsafe(loop.stop)
+        runner.join()
+        loop.close()
+        pool.shutdown()
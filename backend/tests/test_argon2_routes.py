@@ -0,0 +1,79 @@
+import json
+
+from argon2 import PasswordHasher
+
+from app.main import app
+from app.routes import argon2 as argon2_routes
+from app.security import needs_upgrade, ph
+
+
+def sse_steps(body: str):
+    return [json.loads(line[len("data: "):]) for line in body.split("\n\n") if line]
+
+
+def test_stream_reports_each_step(monkeypatch, state, asgi):
+    monkeypatch.setattr(argon2_routes, "ARGON2_STREAM_DELAY", 0)
+    completed = argon2_routes.argon2_pool.stats()["completed"]
+
+    response = asgi(app, "GET", "/argon2-stream", params={"password": "pw"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = sse_steps(response.text)
+    assert [e["step"] for e in events] == ["queued", "hashing", "salt", "params", "hash", "done"]
+    assert events[4]["value"].startswith("$argon2id$")
+    assert events[4]["value"].split("$")[4] == events[2]["value"]
+    assert events[5]["value"]["elapsed_ms"] >= 0
+
+    # Hashed on the dedicated pool, not the event loop
+    assert argon2_routes.argon2_pool.stats()["completed"] == completed + 1
+
+
+def test_verify_flags_weaker_hashes_for_rehash(state, asgi):
+    weak = PasswordHasher(time_cost=1, memory_cost=1024, parallelism=1).hash("pw")
+
+    result = asgi(app, "POST", "/argon2/verify",
+                  json={"password": "pw", "hash": weak, "rehash": True}).json()
+    assert result["valid"] and result["needs_rehash"]
+    assert not needs_upgrade(result["new_hash"])
+
+    # A mismatch never produces a new hash
+    result = asgi(app, "POST", "/argon2/verify",
+                  json={"password": "nope", "hash": weak, "rehash": True}).json()
+    assert not result["valid"] and "new_hash" not in result
+
+    response = asgi(app, "POST", "/argon2/verify", json={"password": "pw", "hash": "garbage"})
+    assert response.status_code == 400
+
+
+def test_batch_streams_one_line_per_item(state, asgi):
+    stored = ph.hash("right")
+    items = [
+        {"id": "new", "password": "pw"},
+        {"id": "ok", "password": "right", "hash": stored},
+        {"id": "bad", "password": "wrong", "hash": stored},
+        {"id": "broken", "password": "pw", "hash": "garbage"}
+    ]
+
+    response = asgi(app, "POST", "/argon2/batch", json={"items": items})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = {line["id"]: line for line in map(json.loads, response.text.splitlines())}
+    assert sorted(line["index"] for line in lines.values()) == [0, 1, 2, 3]
+    assert lines["new"]["op"] == "hash" and lines["new"]["hash"].startswith("$argon2id$")
+    assert lines["ok"]["valid"] and not lines["ok"]["needs_rehash"]
+    assert not lines["bad"]["valid"]
+    assert lines["broken"]["error"] == "Invalid Argon2 hash"
+
+    state["pipeline"].flush()
+    event = state["pipeline"].store.latest(1)[0]
+    assert event["event_type"] == "ARGON2_BATCH_COMPLETED"
+    assert event["meta"]["counts"] == {
+        "hashed": 1, "valid": 1, "invalid": 1, "needs_rehash": 0, "errors": 1
+    }
+
+
+def test_batch_rejects_oversized_requests(monkeypatch, state, asgi):
+    monkeypatch.setattr(argon2_routes, "ARGON2_BATCH_MAX", 2)
+    items = [{"password": "pw"}] * 3
+    assert asgi(app, "POST", "/argon2/batch", json={"items": items}).status_code == 413
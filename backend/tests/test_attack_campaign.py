@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from app import attack_campaign
+from app.security import USED_NONCES
+from app.soc_store import SOC_PIPELINE
+from app.threat import THREATS
+
+
+def test_campaign_leaves_real_state_alone():
+    SOC_PIPELINE.flush()
+    before = (THREATS.stats(), SOC_PIPELINE.stats(), len(USED_NONCES))
+
+    result = asyncio.run(attack_campaign.run_campaign(total=200, concurrency=10, seed=7))
+
+    assert result["requests"] == 200
+    assert result["false_positive_rate"] == 0
+    assert result["detection_rate"] == 1
+    assert result["threats"]["checked"] > 0
+
+    SOC_PIPELINE.flush()
+    assert (THREATS.stats(), SOC_PIPELINE.stats(), len(USED_NONCES)) == before
+
+
+def test_one_campaign_at_a_time():
+    with attack_campaign._RUNNING:
+        with pytest.raises(attack_campaign.CampaignBusyError):
+            asyncio.run(attack_campaign.run_campaign(total=10))
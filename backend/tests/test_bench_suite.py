@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+
+from bench import suite
+
+
+def test_compare_flags_regressions_past_threshold():
+    baseline = {"results": [
+        {"name": "aes", "throughput_rps": 1000.0, "p95_ms": 2.0},
+        {"name": "hmac", "throughput_rps": 1000.0, "p95_ms": 2.0},
+        {"name": "ws", "deliveries_per_s": 500.0, "p95_ms": 10.0}
+    ]}
+    results = [
+        {"name": "aes", "throughput_rps": 950.0, "p95_ms": 2.1},
+        {"name": "hmac", "throughput_rps": 800.0, "p95_ms": 2.0},
+        {"name": "ws", "deliveries_per_s": 500.0, "p95_ms": 12.0},
+        {"name": "new", "throughput_rps": 1.0, "p95_ms": 1.0}
+    ]
+
+    rows = {r["name"]: r for r in suite.compare(results, baseline, threshold=10)}
+    assert set(rows) == {"aes", "hmac", "ws"}
+    assert rows["aes"] == {
+        "name": "aes", "throughput_change_pct": -5.0, "p95_change_pct": 5.0, "regression": False
+    }
+    assert rows["hmac"]["regression"] and rows["hmac"]["throughput_change_pct"] == -20.0
+    assert rows["ws"]["regression"] and rows["ws"]["p95_change_pct"] == 20.0
+
+
+def test_every_endpoint_scenario_succeeds():
+    args = argparse.Namespace(only="aes,hmac,soc", requests=4, argon2_requests=1,
+                              concurrency=2, soc_events=20)
+
+    results = asyncio.run(suite.run_suite(args))
+
+    names = {r["name"] for r in results}
+    expected = {
+        name for name, spec in {**suite.direct_scenarios(), **suite.http_scenarios()}.items()
+        if spec["group"] in ("aes", "hmac", "soc")
+    }
+    assert names == expected
+    assert [r["name"] for r in results if r["errors"]] == []
+    assert all(r["requests"] == 4 for r in results)
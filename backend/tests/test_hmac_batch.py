@@ -0,0 +1,66 @@
+import json
+import time
+import uuid
+
+from app import security
+from app.main import app
+from app.routes import hmac as hmac_routes
+
+
+def entry(user_id: str = "alice") -> dict:
+    fields = {
+        "action": "TRANSFER",
+        "user_id": user_id,
+        "resource": "account",
+        "nonce": uuid.uuid4().hex,
+        "timestamp": str(int(time.time()))
+    }
+    mac = security.hmac_state().copy()
+    mac.update("|".join(fields.values()).encode())
+    return {**fields, "signature": mac.hexdigest()}
+
+
+def ndjson(entries) -> bytes:
+    return b"\n".join(json.dumps(e).encode() for e in entries)
+
+
+def test_valid_batch(state, asgi):
+    entries = [entry() for _ in range(3)]
+    entries[1]["signature"] = "0" * 64
+
+    r = asgi(app, "POST", "/hmac/batch", json=entries)
+    assert r.status_code == 200
+    assert r.json()["verified"] == 2
+    assert r.json()["results"][1]["status"] == "Rejected"
+
+
+def test_ndjson_stops_at_entry_cap(state, asgi, monkeypatch):
+    monkeypatch.setattr(hmac_routes, "HMAC_BATCH_MAX", 3)
+    body = ndjson(entry() for _ in range(3)) + b"\n" + b"not json\n" * 5
+
+    r = asgi(app, "POST", "/hmac/batch", content=body,
+             headers={"content-type": "application/x-ndjson"})
+    assert r.status_code == 413
+
+
+def test_body_size_is_capped(state, asgi, monkeypatch):
+    monkeypatch.setattr(hmac_routes, "HMAC_BATCH_MAX_MB", 1)
+    r = asgi(app, "POST", "/hmac/batch", content=b"[" + b" " * (2 * 1024 * 1024) + b"]",
+             headers={"content-type": "application/json"})
+    assert r.status_code == 413
+
+
+def test_entry_errors_are_user_facing(state, asgi):
+    r = asgi(app, "POST", "/hmac/batch", json=[entry(), 42])
+    assert r.status_code == 422
+    assert r.json()["detail"] == "Invalid batch: entry 1 must be a JSON object"
+
+    missing = entry()
+    del missing["nonce"]
+    r = asgi(app, "POST", "/hmac/batch", json=[missing])
+    assert r.status_code == 422
+    assert r.json()["detail"] == "Invalid batch: entry 0: nonce: Field required"
+
+    r = asgi(app, "POST", "/hmac/batch", content=b"{}",
+             headers={"content-type": "application/json"})
+    assert r.json()["detail"] == "Invalid batch: expected a JSON array"
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import time
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app import security
+from app.hmac_middleware import HMACSigningMiddleware, SignatureError
+
+# ===============================
+# APP UNDER TEST
+# ===============================
+
+app = FastAPI()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Answers while the body is still read (full-duplex clients).
+
+    The base class watches receive() for a disconnect while streaming,
+    which would swallow request body chunks.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+@app.post("/signed/upload")
+async def upload(request: Request):
+    digest = hashlib.sha256()
+    async for part in request.stream():
+        digest.update(part)
+    return {"sha256": digest.hexdigest()}
+
+
+@app.post("/signed/echo")
+async def echo(request: Request):
+    # Answers while it reads, like /aes/stream/*
+    async def stream():
+        async for part in request.stream():
+            yield part
+    return DuplexStreamingResponse(stream(), media_type="application/octet-stream")
+
+
+@app.post("/signed/early")
+async def early():
+    # Answers without reading the body at all
+    return {"status": "ok"}
+
+
+app.add_middleware(HMACSigningMiddleware, prefixes=["/signed"])
+
+# ===============================
+# HELPERS
+# ===============================
+
+def signed(path: str, body: bytes, nonce: str = None, timestamp: int = None) -> dict:
+    nonce = nonce or uuid.uuid4().hex
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    mac = security.hmac_state().copy()
+    mac.update(f"POST|{path}|{nonce}|{timestamp}|".encode() + body)
+    return {"x-signature": mac.hexdigest(), "x-nonce": nonce, "x-timestamp": timestamp}
+
+
+def chunks(body: bytes, size: int = 1024):
+    async def gen():
+        for i in range(0, len(body), size):
+            yield body[i:i + size]
+    return gen()
+
+
+def post(path: str, content, headers: dict) -> httpx.Response:
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, content=content, headers=headers)
+    return asyncio.run(go())
+
+# ===============================
+# HEADERS
+# ===============================
+
+def test_valid_upload(state):
+    body = b"x" * 5000
+    r = post("/signed/upload", chunks(body), signed("/signed/upload", body))
+    assert r.status_code == 200
+    assert r.json()["sha256"] == hashlib.sha256(body).hexdigest()
+    assert len(state["nonces"]) == 1
+
+
+def test_missing_headers(state):
+    r = post("/signed/upload", b"data", {})
+    assert r.status_code == 401
+
+
+def test_replay_rejected(state):
+    body = b"payload"
+    headers = signed("/signed/upload", body)
+    assert post("/signed/upload", body, headers).status_code == 200
+
+    r = post("/signed/upload", body, headers)
+    assert r.status_code == 401
+    assert "Replay" in r.json()["detail"]
+
+
+def test_stale_timestamp_rejected(state):
+    body = b"payload"
+    headers = signed("/signed/upload", body, timestamp=int(time.time()) - 999)
+    r = post("/signed/upload", body, headers)
+    assert r.status_code == 401
+    assert "Stale" in r.json()["detail"]
+    assert len(state["nonces"]) == 0
+
+# ===============================
+# BODY
+# ===============================
+
+def test_tampered_body_rejected(state):
+    body = b"x" * 5000
+    headers = signed("/signed/upload", body)
+    r = post("/signed/upload", chunks(body + b"!"), headers)
+    assert r.status_code == 401
+    assert "tampered" in r.json()["detail"]
+
+    # The nonce is only burnt by a verified request
+    assert len(state["nonces"]) == 0
+
+
+def test_streamed_route_valid(state):
+    body = bytes(range(256)) * 40
+    r = post("/signed/echo", chunks(body), signed("/signed/echo", body))
+    assert r.status_code == 200
+    assert r.content == body
+
+
+def test_streamed_route_tampered_is_aborted(state):
+    # Output started before the last chunk: the transfer is cut, not 200
+    body = bytes(range(256)) * 40
+    headers = signed("/signed/echo", body)
+    with pytest.raises(SignatureError):
+        post("/signed/echo", chunks(body[:-1] + b"!"), headers)
+
+
+def test_early_response_held_until_verified(state):
+    body = b"x" * 5000
+    assert post("/signed/early", chunks(body), signed("/signed/early", body)).status_code == 200
+
+    # Same route, bad body: the held response is replaced by a 401
+    r = post("/signed/early", chunks(body + b"!"), signed("/signed/early", body))
+    assert r.status_code == 401
+
+
+def test_failures_feed_threat_scoring(state):
+    for _ in range(state["threats"].max_failures):
+        post("/signed/upload", b"data", {})
+
+    r = post("/signed/upload", b"data", {})
+    assert r.status_code == 429
+    assert "Retry-After" in r.headers
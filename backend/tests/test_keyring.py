@@ -0,0 +1,49 @@
+import pytest
+
+from app.keyring import KeyRing, load_ring
+
+KEY_A = b"a" * 32
+KEY_B = b"b" * 32
+
+
+def test_rotation_keeps_old_keys_for_decrypt():
+    ring = KeyRing("aes", {"k1": KEY_A}, "k1")
+    key_id, cipher = ring.aes()
+    ciphertext = cipher.encrypt(b"\0" * 12, b"secret", None)
+
+    ring.rotate("k2", KEY_B)
+    assert ring.aes()[0] == "k2"
+    assert ring.aes("k1")[1].decrypt(b"\0" * 12, ciphertext, None) == b"secret"
+
+    ring.retire("k1")
+    with pytest.raises(ValueError):
+        ring.aes("k1")
+    with pytest.raises(ValueError):
+        ring.retire("k2")
+
+
+def test_tenant_keys_are_isolated():
+    ring = KeyRing("aes", {"k1": KEY_A}, "k1")
+    tenant_a, tenant_b = ring.key(tenant="a"), ring.key(tenant="b")
+
+    assert len(tenant_a) == len(KEY_A)
+    assert len({KEY_A, tenant_a, tenant_b}) == 3
+    assert ring.key(tenant="a") == tenant_a
+
+    # Same master under another purpose derives a different key
+    assert KeyRing("hmac", {"k1": KEY_A}, "k1").key(tenant="a") != tenant_a
+
+
+def test_load_ring_rejects_bad_aes_key_length():
+    with pytest.raises(ValueError, match="'short'"):
+        load_ring("aes", f"good:{'x' * 32},short:tooshort", "good", KEY_A)
+    with pytest.raises(ValueError, match="'default'"):
+        load_ring("aes", "", "", b"x" * 20)
+
+    ring = load_ring("aes", f"k16:{'x' * 16},k24:{'y' * 24}", "", KEY_A)
+    assert ring.active_id == "k24"
+    with pytest.raises(ValueError):
+        ring.add("k3", b"x" * 31)
+
+    # HMAC secrets have no fixed length
+    assert load_ring("hmac", "", "", b"demo").active_id == "default"
@@ -0,0 +1,43 @@
+from app.main import app
+from app.metrics import Counter, Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("demo_seconds", "Demo", ("op",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value, ("x",))
+
+    assert hist.render() == [
+        "# HELP demo_seconds Demo",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{op="x",le="0.1"} 2',
+        'demo_seconds_bucket{op="x",le="1.0"} 3',
+        'demo_seconds_bucket{op="x",le="+Inf"} 4',
+        'demo_seconds_sum{op="x"} 3.65',
+        'demo_seconds_count{op="x"} 4'
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("demo_total", "Demo", ("route",))
+    counter.inc(('a"b\\c\nd',), 2)
+    assert counter.render()[-1] == 'demo_total{route="a\\"b\\\\c\\nd"} 2'
+
+
+def test_scrape_has_route_templates_and_crypto_timings(state, asgi):
+    asgi(app, "POST", "/aes-demo", params={"data": "x"})
+    asgi(app, "GET", "/no/such/route")
+
+    response = asgi(app, "GET", "/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+
+    assert 'cryptoguard_crypto_seconds_count{op="aes_encrypt"}' in text
+    assert 'cryptoguard_http_requests_total{route="/aes-demo",method="POST",status="200"}' in text
+    assert 'route="unmatched",method="GET",status="404"' in text
+    assert "/no/such/route" not in text
+    assert 'cryptoguard_http_requests_inflight ' in text
+
+
+def test_profiler_is_off_by_default(asgi):
+    assert asgi(app, "GET", "/metrics/profile", params={"seconds": 0.1}).status_code == 404
@@ -0,0 +1,70 @@
+from app.nonce_store import NonceStore, SQLiteNonceStore
+
+
+# ===============================
+# IN-MEMORY BUCKETS
+# ===============================
+
+def test_replay_rejected():
+    store = NonceStore(window=30)
+    assert store.add("n1", 1000, now=1000)
+    assert not store.add("n1", 1000, now=1001)
+    assert store.seen("n1", now=1001)
+    assert len(store) == 1
+
+
+def test_bucket_expires_after_window_and_margin():
+    store = NonceStore(window=30, bucket_seconds=10, margin=5)
+    store.add("n1", 1000, now=1000)
+
+    # Valid until 1000 + 30 + 5, bucket 103 is dropped once now reaches 1040
+    assert store.seen("n1", now=1039)
+    assert not store.seen("n1", now=1040)
+    assert len(store) == 0
+    assert store.evicted == 1
+    assert store.evicted_buckets == 1
+
+    # Expired nonce may be used again (the timestamp check rejects old ones)
+    assert store.add("n1", 1040, now=1040)
+
+
+def test_only_expired_buckets_are_dropped():
+    store = NonceStore(window=30, bucket_seconds=10, margin=5)
+    store.add("old", 1000, now=1000)
+    store.add("new", 1020, now=1020)
+
+    assert not store.seen("old", now=1045)
+    assert store.seen("new", now=1045)
+    assert len(store) == 1
+
+# ===============================
+# SQLITE
+# ===============================
+
+def test_sqlite_replay_rejected(tmp_path):
+    store = SQLiteNonceStore(str(tmp_path / "nonces.db"), window=30)
+    assert store.add("n1", 1000, now=1000)
+    assert not store.add("n1", 1000, now=1001)
+    assert store.seen("n1", now=1001)
+
+
+def test_sqlite_takes_over_expired_row_only(tmp_path):
+    # No purge after the first add: only the conditional upsert can help
+    store = SQLiteNonceStore(str(tmp_path / "nonces.db"), window=30, margin=5,
+                             purge_interval=10 ** 9)
+    assert store.add("n1", 1000, now=1000)    # expires_at 1035
+
+    assert not store.add("n1", 1030, now=1034)
+    assert not store.seen("n1", now=1035)
+    assert store.add("n1", 1040, now=1040)
+    assert not store.add("n1", 1040, now=1041)
+
+
+def test_sqlite_shared_between_stores(tmp_path):
+    # Two workers on the same file see each other's nonces
+    path = str(tmp_path / "nonces.db")
+    first = SQLiteNonceStore(path, window=30)
+    second = SQLiteNonceStore(path, window=30)
+
+    assert first.add("n1", 1000, now=1000)
+    assert not second.add("n1", 1000, now=1000)
@@ -0,0 +1,30 @@
+from app.main import app
+from app.soc_store import EventStore, make_event
+from app.threat import THREATS
+
+
+def test_since_reports_truncation():
+    store = EventStore(capacity=5)
+    store.extend([make_event(1000 + i, "X", f"e{i}") for i in range(8)])   # seq 1..8, 4..8 kept
+
+    events, truncated = store.since(0, limit=100)
+    assert [e["seq"] for e in events] == [4, 5, 6, 7, 8]
+    assert truncated
+
+    events, truncated = store.since(3, limit=2)
+    assert [e["seq"] for e in events] == [4, 5]
+    assert not truncated
+
+    assert store.since(8) == ([], False)
+
+
+def test_status_etag_follows_threat_counters(asgi):
+    first = asgi(app, "GET", "/soc/soc-status")
+    etag = first.headers["etag"]
+    assert asgi(app, "GET", "/soc/soc-status", headers={"if-none-match": etag}).status_code == 304
+
+    # No new event, but the threat numbers in the body changed
+    THREATS.check((("ip", "198.51.100.7"),))
+    second = asgi(app, "GET", "/soc/soc-status", headers={"if-none-match": etag})
+    assert second.status_code == 200
+    assert second.json()["threats"]["checked"] == first.json()["threats"]["checked"] + 1
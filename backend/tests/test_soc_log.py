@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+from app.soc_log import EventLog
+from app.soc_store import make_event
+
+# PIDs above the largest possible pid_max (2 ** 22): their workers are certainly gone
+DEAD = ("4194305", "4194306", "4194307")
+
+
+def events(count: int, start: float) -> list:
+    return [make_event(start + i, "AES_DECRYPT_SUCCESS", f"event {i}") for i in range(count)]
+
+
+def write_segment(directory, created_ms: int, writer: str, batch: list) -> None:
+    path = os.path.join(directory, f"seg-{created_ms:013d}-{writer}.jsonl")
+    with open(path, "w") as f:
+        for event in batch:
+            f.write(json.dumps(event, separators=(",", ":")) + "\n")
+
+
+def test_restore_after_restart(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.append(events(300, time.time() - 300))
+    log.close()
+
+    restored = EventLog(str(tmp_path))
+    tail = restored.tail(100)
+    assert [e["message"] for e in tail] == [f"event {i}" for i in range(200, 300)]
+
+    middle = restored.query(tail[0]["timestamp"], tail[9]["timestamp"], limit=1000)
+    assert [e["message"] for e in middle] == [f"event {i}" for i in range(200, 210)]
+
+
+def test_streams_are_merged_by_timestamp(tmp_path):
+    now = time.time()
+    write_segment(tmp_path, 1, DEAD[0], events(5, now)[0::2])
+    write_segment(tmp_path, 2, DEAD[1], events(5, now)[1::2])
+
+    log = EventLog(str(tmp_path))
+    assert [e["message"] for e in log.query(limit=10)] == [f"event {i}" for i in range(5)]
+    assert [e["message"] for e in log.tail(2)] == ["event 3", "event 4"]
+
+
+def test_dead_writers_expire(tmp_path):
+    three_years = time.time() - 3 * 365 * 86400
+    for i, writer in enumerate(DEAD):
+        write_segment(tmp_path, i + 1, writer, events(3, three_years))
+
+    log = EventLog(str(tmp_path), retention_days=1)
+    assert log.deleted_segments == 3
+    assert log.segments == []
+    assert not any(name.endswith(".jsonl") for name in os.listdir(tmp_path))
+
+
+def test_live_writer_keeps_its_newest_segment(tmp_path):
+    three_years = time.time() - 3 * 365 * 86400
+    write_segment(tmp_path, 1, str(os.getppid()), events(3, three_years))
+    write_segment(tmp_path, 2, str(os.getppid()), events(3, three_years))
+
+    log = EventLog(str(tmp_path), retention_days=1)
+    assert log.deleted_segments == 1
+    assert len(log.segments) == 1
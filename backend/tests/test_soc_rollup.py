@@ -0,0 +1,47 @@
+from app.soc_rollup import TOTAL, RollupEngine, RollupSeries
+from app.soc_store import make_event
+
+NOW = 1_700_000_000.0
+
+
+def event(ts: float, event_type: str = "AES_DECRYPT_SUCCESS", module: str = "aes") -> dict:
+    return make_event(ts, event_type, "m", {"module": module})
+
+
+def test_late_event_does_not_wipe_newer_bucket():
+    series = RollupSeries(bucket_seconds=1, buckets=10)
+    series.add(NOW, [TOTAL])
+    series.add(NOW, [TOTAL])
+
+    # Same slot, ten buckets earlier
+    series.add(NOW - 10, [TOTAL])
+
+    assert series.window(NOW, 1)[0][1][TOTAL] == 2
+
+
+def test_window_counts_and_expiry():
+    engine = RollupEngine()
+    engine.add_many([event(NOW - 2), event(NOW - 2), event(NOW, "HMAC_AUTH_SUCCESS", "hmac")])
+
+    result = engine.timeseries("1s", 3, now=NOW)
+    assert result["series"]["total"] == [2, 0, 1]
+    assert result["t"] == [NOW - 2, NOW - 1, NOW]
+
+    by_module = engine.timeseries("1s", 3, "module", now=NOW)["series"]
+    assert by_module == {"aes": [2, 0, 0], "hmac": [0, 0, 1]}
+
+    one_type = engine.timeseries("1m", 1, "event_type", "HMAC_AUTH_SUCCESS", now=NOW)
+    assert one_type["series"] == {"HMAC_AUTH_SUCCESS": [1]}
+
+    # An hour later the 1s ring has moved past them, the 1h one has not
+    later = NOW + 3600
+    assert sum(engine.timeseries("1s", 3600, now=later)["series"]["total"]) == 0
+    assert sum(engine.timeseries("1h", 2, now=later)["series"]["total"]) == 3
+
+
+def test_module_active_window():
+    engine = RollupEngine(active_seconds=60)
+    engine.add_many([event(NOW)])
+    assert engine.module_active("aes", now=NOW + 60)
+    assert not engine.module_active("aes", now=NOW + 61)
+    assert not engine.module_active("hmac", now=NOW)
@@ -0,0 +1,50 @@
+from app.soc_index import tokenize
+from app.soc_store import EventStore, make_event
+
+
+def stamp(ts):
+    return make_event(ts, "X", "")["timestamp"]
+
+
+def test_search_intersects_posting_lists():
+    store = EventStore(capacity=100)
+    store.extend([
+        make_event(1000, "AES", "key rotated", {"module": "aes"}),
+        make_event(1001, "HMAC", "nonce reused", {"module": "hmac", "level": "warn"}),
+        make_event(1002, "AES", "decrypt failed", {"module": "aes", "level": "warn"}),
+        make_event(1003, "AES", "decrypt ok", {"module": "aes"})
+    ])
+
+    events, _ = store.search({"module": "aes", "level": "warn"})
+    assert [e["seq"] for e in events] == [3]
+
+    events, _ = store.search({"module": "aes"}, tokenize("decrypt"))
+    assert [e["seq"] for e in events] == [4, 3]
+
+    assert store.search({"module": "argon2"}) == ([], 0)
+
+
+def test_search_time_range_with_late_timestamp():
+    store = EventStore(capacity=100)
+    store.extend([make_event(1000 + i, "X", f"e{i}") for i in range(5)])
+    # A synchronously logged event stamped before the last pipeline batch
+    store.append(make_event(1001.5, "X", "late"))
+    store.extend([make_event(1010 + i, "X", f"f{i}") for i in range(3)])
+
+    events, _ = store.search({}, start=stamp(1004), end=stamp(1005), newest_first=False)
+    assert [e["message"] for e in events] == ["e4", "late"]
+
+    events, _ = store.search({}, tokenize("f1"), start=stamp(1004))
+    assert [e["message"] for e in events] == ["f1"]
+
+    timestamps = [e["timestamp"] for e in store.latest(100)][::-1]
+    assert timestamps == sorted(timestamps)
+
+
+def test_eviction_drops_postings():
+    store = EventStore(capacity=3)
+    store.extend([make_event(1000 + i, "AES" if i % 2 else "HMAC", f"e{i}") for i in range(6)])
+
+    events, _ = store.search({"event_type": "AES"}, newest_first=False)
+    assert [e["message"] for e in events] == ["e3", "e5"]
+    assert store.counts.as_dict()["event_type"] == {"AES": 2, "HMAC": 1}
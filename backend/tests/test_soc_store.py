@@ -0,0 +1,89 @@
+import threading
+import time
+
+from app.soc_store import EventPipeline, EventStore, make_event
+
+
+def event(i, module="aes", level="info"):
+    return make_event(1000 + i, f"T{i % 2}", f"e{i}", {"module": module, "level": level})
+
+
+def test_ring_evicts_oldest_and_keeps_counters():
+    store = EventStore(capacity=4)
+    store.extend([event(i, module="aes" if i < 3 else "hmac") for i in range(6)])
+
+    assert len(store) == 4
+    assert store.last_seq == 6
+    assert [e["message"] for e in store.latest(10)] == ["e5", "e4", "e3", "e2"]
+    assert [e["message"] for e in store.latest(2)] == ["e5", "e4"]
+
+    counts = store.counts.as_dict()
+    assert counts["module"] == {"aes": 1, "hmac": 3}
+    assert counts["event_type"] == {"T0": 2, "T1": 2}
+    assert counts["level"] == {"info": 4}
+
+
+def test_restored_events_keep_their_seq():
+    store = EventStore(capacity=4)
+    restored = [dict(event(i), seq=100 + i) for i in range(3)]
+    store.extend(restored)
+    store.append(event(9))
+
+    assert [e["seq"] for e in store.latest(10)] == [103, 102, 101, 100]
+
+
+def test_clear_keeps_seq_moving_forward():
+    store = EventStore(capacity=4)
+    store.extend([event(i) for i in range(3)])
+    store.clear()
+
+    assert len(store) == 0
+    assert store.counts.as_dict()["module"] == {}
+
+    store.append(event(3))
+    assert store.latest(1)[0]["seq"] == 4
+
+
+def test_pipeline_batches_and_isolates_sinks():
+    pipeline = EventPipeline(EventStore(capacity=100), batch_max=4)
+    batches = []
+
+    def broken(events):
+        raise RuntimeError("sink down")
+
+    pipeline.add_sink(broken)
+    pipeline.add_sink(batches.append)
+
+    for i in range(10):
+        assert pipeline.emit("X", f"e{i}", {"module": "aes"})
+    assert pipeline.flush()
+
+    assert [e["message"] for e in pipeline.store.latest(10)][::-1] == [f"e{i}" for i in range(10)]
+    assert sum(map(len, batches)) == 10
+    assert max(map(len, batches)) <= 4
+
+    stats = pipeline.stats()
+    assert (stats["processed"], stats["queued"], stats["dropped"]) == (10, 0, 0)
+    assert stats["sink_errors"] == stats["batches"] == len(batches)
+    pipeline.stop()
+
+
+def test_pipeline_drops_when_queue_is_full():
+    pipeline = EventPipeline(EventStore(capacity=100), queue_size=3)
+    gate = threading.Event()
+    pipeline.add_sink(lambda events: gate.wait())
+
+    # The first event holds the worker in the sink; three more fill the queue
+    pipeline.emit("X", "held")
+    while pipeline.stats()["queued"]:
+        time.sleep(0.001)
+    accepted = [pipeline.emit("X", f"e{i}") for i in range(5)]
+
+    assert accepted == [True, True, True, False, False]
+    assert not pipeline.flush(timeout=0.05)
+
+    gate.set()
+    assert pipeline.flush()
+    assert pipeline.stats()["dropped"] == 2
+    assert len(pipeline.store) == 4
+    pipeline.stop()
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from app.threat import ThreatBlockedError, ThreatEngine
+
+IP = (("ip", "203.0.113.9"),)
+
+
+def engine(**kwargs):
+    options = dict(window=60, max_failures=10, block_seconds=300, rate=1, burst=2,
+                   report_seconds=10)
+    options.update(kwargs)
+    return ThreatEngine(**options)
+
+
+def test_block_lasts_block_seconds(state):
+    threats = engine(burst=100)
+    threats.fail(IP, 9, now=1000)
+    threats.check(IP, now=1001)
+
+    threats.fail(IP, 1, now=1002)
+    with pytest.raises(ThreatBlockedError) as blocked:
+        threats.check(IP, now=1003)
+    assert blocked.value.retry_after == 299
+    assert threats.blocked(now=1301.9) == 1
+
+    threats.check(IP, now=1302)
+    assert threats.stats()["blocks"] == 1
+
+    state["pipeline"].flush()
+    event = state["pipeline"].store.latest(1)[0]
+    assert (event["event_type"], event["meta"]["failures"]) == ("ATTACK_BLOCKED", 10)
+
+
+def test_previous_window_counts_by_overlap(state):
+    threats = engine()
+    threats.fail(IP, 6, now=1000)
+
+    # Half of the previous window still overlaps: 6 * 0.5 + 6 = 9
+    threats.fail(IP, 6, now=1090)
+    assert threats.blocked(now=1090) == 0
+    threats.fail(IP, 1, now=1090)
+    assert threats.blocked(now=1090) == 1
+
+    # After a whole empty window nothing carries over
+    other = engine()
+    other.fail(IP, 9, now=1000)
+    other.fail(IP, 9, now=1125)
+    assert other.blocked(now=1125) == 0
+
+
+def test_token_bucket_refills_at_rate(state):
+    threats = engine()
+    threats.check(IP, now=1000)
+    threats.check(IP, now=1000)
+    with pytest.raises(ThreatBlockedError) as limited:
+        threats.check(IP, now=1000.5)
+    assert limited.value.retry_after == 1
+
+    threats.check(IP, now=1001.5)
+    threats.check(IP, cost=0, now=1001.5)
+    assert threats.stats()["rate_limited"] == 1
+
+
+def test_rejections_are_reported_once_per_interval(state):
+    threats = engine(burst=1, report_seconds=10)
+    now = time.time()
+    threats.check(IP, now=now)
+    for i in range(1, 5):
+        with pytest.raises(ThreatBlockedError):
+            threats.check(IP, now=now + i / 10)
+
+    state["pipeline"].flush()
+    assert len(state["pipeline"].store) == 0
+
+    threats.check(IP, cost=0, now=now + 11)
+    state["pipeline"].flush()
+    events = state["pipeline"].store.latest(10)
+    assert len(events) == 1
+    assert events[0]["meta"]["count"] == 4
+    assert events[0]["meta"]["clients"] == {"ip:203.0.113.9": 4}
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+from app import ws_manager as ws_module
+from app.ws_manager import WSManager
+
+
+class FakeSocket:
+    """Just the WebSocket calls WSManager makes."""
+
+    def __init__(self, stuck: bool = False):
+        self.stuck = stuck
+        self.frames = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        if self.stuck:
+            await asyncio.Event().wait()
+        self.frames.append(data)
+
+    async def close(self):
+        self.closed = True
+
+
+def test_events_from_other_threads_go_out_in_one_frame():
+    manager = WSManager()
+    ws = FakeSocket()
+
+    async def go():
+        await manager.connect(ws)
+        worker = threading.Thread(target=manager.publish_many, args=([{"n": i} for i in range(3)],))
+        worker.start()
+        worker.join()
+        manager.publish({"n": 3})
+        await asyncio.sleep(0.2)
+        manager.disconnect(ws)
+
+    asyncio.run(go())
+    # Other threads' events are handed to the loop, so they land after n=3,
+    # and a wake-up for events already sent never produces an empty frame
+    assert ws.frames == [[{"n": 3}, {"n": 0}, {"n": 1}, {"n": 2}]]
+    assert manager.stats()["published"] == 4
+
+
+def test_stuck_client_is_dropped_without_delaying_others(monkeypatch):
+    monkeypatch.setattr(ws_module, "WS_SEND_TIMEOUT", 0.1)
+    monkeypatch.setattr(ws_module, "WS_QUEUE_SIZE", 2)
+    manager = WSManager()
+    fast, stuck = FakeSocket(), FakeSocket(stuck=True)
+
+    async def go():
+        await manager.connect(fast)
+        await manager.connect(stuck)
+
+        manager.publish({"n": 0})
+        await asyncio.sleep(0.08)
+        # The fast client already has it while the stuck one is still sending
+        assert fast.frames == [[{"n": 0}]]
+
+        # Bounded per-client queue: the oldest events are dropped
+        manager.publish_many([{"n": i} for i in range(1, 5)])
+        assert manager.stats()["dropped"] >= 2
+
+        await asyncio.sleep(0.3)
+        manager.disconnect(fast)
+
+    asyncio.run(go())
+    assert stuck.closed
+    assert fast.frames[-1] == [{"n": 3}, {"n": 4}]
+    assert manager.stats() == {
+        "clients": 0, "published": 5, "disconnected": 2, "queued": 0, "dropped": 0
+    }
@@ -37,17 +37,24 @@ export default function Dashboard() {
       };
 
       wsRef.current.onmessage = (event) => {
-        console.log("SOC EVENT FROM WS:", event.data);
-        const e = JSON.parse(event.data);
-
-        setSoc(prev => ({
-          ...prev,
-          modules: {
-            ...prev.modules,
-            [e.module]: e.level === "danger" ? "ALERT" : "ACTIVE"
-          },
-          events: [e, ...(prev.events || [])].slice(0, 12)
-        }));
+        // Server sends micro-batches (oldest first)
+        const data = JSON.parse(event.data);
+        const batch = Array.isArray(data) ? data : [data];
+
+        setSoc(prev => {
+          const modules = { ...prev.modules };
+          batch.forEach(e => {
+            if (e.module) {
+              modules[e.module] = e.level === "danger" ? "ALERT" : "ACTIVE";
+            }
+          });
+
+          return {
+            ...prev,
+            modules,
+            events: [...[...batch].reverse(), ...(prev.events || [])].slice(0, 12)
+          };
+        });
       };
 
       wsRef.current.onerror = () => {